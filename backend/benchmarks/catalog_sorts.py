@@ -0,0 +1,187 @@
+"""
+Масштабируемость сортировок каталога (GET /api/products?sort=...)
+
+Каталог последовательно наполняется до каждого из размеров --scales; для
+каждой сортировки измеряется медианная задержка первой страницы и страницы
+из середины каталога в режиме курсора (?cursor=) и в режиме страниц
+(?page=, им пользуются фронтенд и catalog.html). По крайним размерам
+считается наклон log(время) / log(размер): для запросов по индексу он
+близок к нулю, для полного просмотра таблицы - к единице. Код возврата 1,
+если наклон хотя бы одного режима больше --max-slope.
+
+    python benchmarks/catalog_sorts.py --scales 1000 10000 100000
+    DATABASE_URL=postgresql://.../lumme_bench python benchmarks/catalog_sorts.py
+
+Скрипт добавляет товары в БД, используйте отдельную базу. Без DATABASE_URL
+создается временная SQLite БД. Режим страниц измеряется в конфигурации по
+умолчанию, со снимком каталога (CATALOG_SNAPSHOT); снимок пересобирается
+после наполнения каталога, время сборки выводится отдельно.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('INIT_DB_ON_STARTUP', 'false')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'catalog_sorts.db'))
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(), 'catalog_sorts.snapshot'))
+# Измеряются БД и снимок, а не кэш каталога
+os.environ['CATALOG_CACHE_TTL'] = '0'
+
+import migrations
+from app_extended import app, db, catalog_snapshot, User, Seller, Product, PRODUCT_KEYSETS
+from pagination import encode_cursor
+
+OCCASIONS = ('birthday', 'wedding', 'anniversary', 'love', 'congratulations')
+SIZES = ('small', 'medium', 'large')
+
+
+def create_seller():
+    run_id = uuid.uuid4().hex[:8]
+    user = User(email=f'bench-seller-{run_id}@lumme.tj', password_hash='!', user_type='seller')
+    db.session.add(user)
+    db.session.flush()
+    seller = Seller(user_id=user.id, shop_name=f'Bench {run_id}')
+    db.session.add(seller)
+    db.session.commit()
+    return seller.id
+
+
+def grow_catalog(seller_id, count, rng, batch=5000):
+    """Добавить count товаров в наличии одной пакетной вставкой на batch строк"""
+    started = datetime(2024, 1, 1)
+    for offset in range(0, count, batch):
+        db.session.execute(db.insert(Product), [{
+            'seller_id': seller_id,
+            'name': f'Букет {uuid.uuid4().hex[:6]}',
+            'price': round(rng.uniform(100, 1500), 0),
+            'occasion': rng.choice(OCCASIONS),
+            'size': rng.choice(SIZES),
+            'stock_quantity': rng.randint(1, 50),
+            'is_in_stock': True,
+            'rating': round(rng.uniform(3, 5), 1),
+            'sold_count': rng.randint(0, 500),
+            'created_at': started + timedelta(minutes=rng.randint(0, 1_000_000))
+        } for _ in range(min(batch, count - offset))])
+        db.session.commit()
+
+    with db.engine.begin() as conn:
+        conn.execute(db.text('ANALYZE'))
+
+
+def middle_cursor(sort):
+    """Курсор страницы из середины каталога для данной сортировки"""
+    columns, descending = PRODUCT_KEYSETS[sort]
+    total = Product.query.filter(Product.is_in_stock == True).count()
+    order = [col.desc() if descending else col.asc() for col in columns]
+    row = db.session.query(*columns).filter(Product.is_in_stock == True).order_by(*order).offset(total // 2).first()
+    return encode_cursor(sort, list(row))
+
+
+def measure(client, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get('/api/products', query_string=params)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{params}: HTTP {response.status_code} {response.get_json()}')
+    return statistics.median(timings)
+
+
+def slope(points):
+    """Наклон log(время)/log(размер) между наименьшим и наибольшим размером"""
+    (n1, t1), (n2, t2) = points[0], points[-1]
+    return math.log(t2 / t1) / math.log(n2 / n1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='размеры каталога по возрастанию')
+    parser.add_argument('--per-page', type=int, default=24)
+    parser.add_argument('--repeat', type=int, default=30, help='запросов на замер')
+    parser.add_argument('--max-slope', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    client = app.test_client()
+    results = {sort: {'first': [], 'middle': [], 'page_first': [], 'page_middle': []} for sort in PRODUCT_KEYSETS}
+    snapshot_builds = []
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        migrations.upgrade(db.engine, log=lambda message: None)
+        seller_id = create_seller()
+        current = Product.query.filter(Product.is_in_stock == True).count()
+
+        for scale in sorted(args.scales):
+            if scale > current:
+                grow_catalog(seller_id, scale - current, rng)
+                current = scale
+            if catalog_snapshot is not None:
+                # Товары добавлены в обход API: снимок собирается заранее, а не в фоне во время замеров
+                started = time.perf_counter()
+                catalog_snapshot.rebuild()
+                snapshot_builds.append((scale, (time.perf_counter() - started) * 1000))
+
+            for sort in PRODUCT_KEYSETS:
+                base = {'sort': sort, 'per_page': args.per_page}
+                results[sort]['first'].append(
+                    (scale, measure(client, dict(base, cursor=''), args.repeat))
+                )
+                results[sort]['middle'].append(
+                    (scale, measure(client, dict(base, cursor=middle_cursor(sort)), args.repeat))
+                )
+                results[sort]['page_first'].append(
+                    (scale, measure(client, dict(base, page=1), args.repeat))
+                )
+                results[sort]['page_middle'].append(
+                    (scale, measure(client, dict(base, page=max(current // args.per_page // 2, 1)), args.repeat))
+                )
+
+    report = []
+    for sort, pages in results.items():
+        for page, points in pages.items():
+            report.append({
+                'sort': sort,
+                'page': page,
+                'ms': {str(n): round(t, 2) for n, t in points},
+                'slope': round(slope(points), 3) if len(points) > 1 else None
+            })
+    failed = [row for row in report if row['slope'] is not None and row['slope'] > args.max_slope]
+
+    snapshot = {str(n): round(t, 1) for n, t in snapshot_builds} if catalog_snapshot is not None else None
+
+    if args.json:
+        print(json.dumps({
+            'database': dialect, 'snapshot_build_ms': snapshot, 'results': report
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(f"БД: {dialect}, размеры: {', '.join(map(str, sorted(args.scales)))}")
+        if snapshot is None:
+            print('Снимок каталога выключен: режим страниц читает БД')
+        else:
+            print('Сборка снимка: ' + '  '.join(f'{n}: {t:.1f} ms' for n, t in snapshot.items()))
+        for row in report:
+            timings = '  '.join(f'{n}: {t:7.2f} ms' for n, t in row['ms'].items())
+            print(f"{row['sort']:11} {row['page']:11} {timings}  наклон {row['slope']}")
+        for row in failed:
+            print(f"❌ {row['sort']} ({row['page']}): наклон {row['slope']} > {args.max_slope}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
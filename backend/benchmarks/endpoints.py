@@ -0,0 +1,443 @@
+"""
+Бенчмарк маршрутов API Lumme по масштабам данных и БД
+
+    python benchmarks/endpoints.py run --scales small medium --output results.json
+    python benchmarks/endpoints.py run --postgres postgresql://.../lumme_bench --output results.json
+    python benchmarks/endpoints.py compare baseline.json results.json --threshold 0.2
+
+run: для каждой БД (SQLite всегда, PostgreSQL - если задан --postgres или
+BENCH_POSTGRES_URL и сервер доступен) и каждого масштаба данные создаются
+generate_data.py, затем app_extended.app запускается в отдельном процессе
+и для каждого маршрута измеряются задержки одного клиента (p50/p90/p99) и
+пропускная способность --concurrency параллельных клиентов. Результаты -
+JSON-файл --output.
+
+Приложение работает в конфигурации по умолчанию, как в production: кэш и
+снимок каталога, поисковый индекс; снимок и индекс строятся до замеров,
+как в воркере gunicorn. --no-snapshot и --no-cache выключают снимок и кэш
+каталога, чтобы измерить сами маршруты и БД.
+
+Заполненные SQLite-базы кэшируются в --data-dir по масштабу и seed (данные
+детерминированы), каждый прогон работает с копией. База --postgres
+очищается (DROP SCHEMA public CASCADE) перед каждым масштабом - используйте
+отдельную базу.
+
+compare: сравнивает два файла результатов по (БД, масштаб, маршрут).
+Регрессия - рост --metric больше чем на --threshold (и больше
+--min-delta-ms) или падение пропускной способности больше чем на
+--threshold. Код возврата 1, если регрессии есть.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Формат файла результатов
+RESULTS_VERSION = 1
+
+DELIVERY_DATE = (date.today() + timedelta(days=3)).isoformat()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ============================================================================
+# ИЗМЕРЕНИЕ (в дочернем процессе с DATABASE_URL нужной БД)
+# ============================================================================
+
+def load_fixtures(app_module, rng, sample=200):
+    """Выборка товаров и пользователей для запросов; остатки выбранных товаров пополняются"""
+    db, User, Product = app_module.db, app_module.User, app_module.Product
+    Order, OrderItem = app_module.Order, app_module.OrderItem
+
+    product_ids = [product_id for (product_id,) in db.session.query(Product.id).filter(Product.is_in_stock == True)]
+    product_ids = rng.sample(product_ids, min(sample, len(product_ids)))
+    # Заказы в бенчмарке не должны упираться в остаток
+    db.session.execute(
+        db.update(Product).where(Product.id.in_(product_ids)).values(stock_quantity=10 ** 9, is_in_stock=True)
+    )
+    db.session.commit()
+
+    users = {}
+    for user_type in ('seller', 'customer'):
+        ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.user_type == user_type)]
+        users[user_type] = [db.session.get(User, user_id) for user_id in rng.sample(ids, min(20, len(ids)))]
+
+    headers = {
+        user.id: {'Authorization': f'Bearer {app_module.create_user_token(user)}'}
+        for user in users['seller'] + users['customer']
+    }
+
+    # Отзыв оставляется на позицию своего доставленного заказа
+    reviewable = db.session.query(app_module.Customer.user_id, Order.id, OrderItem.product_id).join(
+        Order, Order.customer_id == app_module.Customer.id
+    ).join(OrderItem, OrderItem.order_id == Order.id).filter(
+        app_module.Customer.user_id.in_([user.id for user in users['customer']]),
+        Order.order_status == 'delivered'
+    ).order_by(Order.id).limit(sample).all()
+
+    return {
+        'product_ids': product_ids,
+        'emails': [user.email for user in users['customer']],
+        'seller_headers': [headers[user.id] for user in users['seller']],
+        'customer_headers': [headers[user.id] for user in users['customer']],
+        'reviewable': [(headers[user_id], order_id, product_id) for user_id, order_id, product_id in reviewable],
+    }
+
+
+def build_routes(fixtures, password):
+    """
+    Маршруты бенчмарка: имя -> (ожидаемый статус, функция rng -> (метод, путь, параметры)).
+    Запросы случайны, но воспроизводимы при одинаковом seed.
+    """
+    products = fixtures['product_ids']
+    customers = fixtures['customer_headers']
+    sellers = fixtures['seller_headers']
+    occasions = (None, 'birthday', 'love', 'wedding')
+
+    def products_list(rng):
+        params = {'page': rng.randint(1, 5), 'per_page': 24}
+        occasion = rng.choice(occasions)
+        if occasion:
+            params['occasion'] = occasion
+        return 'GET', '/api/products', {'query_string': params}
+
+    def products_sorted(rng):
+        params = {'sort': rng.choice(('newest', 'price_asc', 'rating', 'popular')), 'per_page': 24, 'cursor': ''}
+        return 'GET', '/api/products', {'query_string': params}
+
+    def review_request(rng):
+        headers, order_id, product_id = rng.choice(fixtures['reviewable'])
+        body = {'order_id': order_id, 'product_id': product_id, 'rating': rng.randint(1, 5), 'review_text': 'Бенчмарк'}
+        return 'POST', '/api/reviews', {'json': body, 'headers': headers}
+
+    def order_body(rng):
+        return {
+            'items': [{'id': rng.choice(products), 'quantity': 1}],
+            'delivery_address': 'Душанбе, ул. Рудаки, 1',
+            'delivery_date': DELIVERY_DATE
+        }
+
+    return {
+        'auth.login': (200, lambda rng: ('POST', '/api/auth/login', {
+            'json': {'email': rng.choice(fixtures['emails']), 'password': password}
+        })),
+        'products.list': (200, products_list),
+        'products.list_sorted': (200, products_sorted),
+        'products.detail': (200, lambda rng: ('GET', f'/api/products/{rng.choice(products)}', {})),
+        'products.search': (200, lambda rng: ('GET', '/api/products/search', {
+            'query_string': {'q': rng.choice(('розы', 'тюльпаны', 'букет из белых', 'pion'))}
+        })),
+        'products.facets': (200, lambda rng: ('GET', '/api/products/facets', {})),
+        'reviews.list': (200, lambda rng: ('GET', f'/api/products/{rng.choice(products)}/reviews', {})),
+        'orders.list_customer': (200, lambda rng: ('GET', '/api/orders', {'headers': rng.choice(customers)})),
+        'orders.list_seller': (200, lambda rng: ('GET', '/api/orders', {'headers': rng.choice(sellers)})),
+        'orders.create': (201, lambda rng: ('POST', '/api/orders', {
+            'json': order_body(rng), 'headers': rng.choice(customers)
+        })),
+        'reviews.create': (201, review_request),
+    }
+
+
+def timed_request(client, make_request, rng):
+    method, path, kwargs = make_request(rng)
+    started = time.perf_counter()
+    status = client.open(path, method=method, **kwargs).status_code
+    return (time.perf_counter() - started) * 1000, status
+
+
+def measure_route(app, make_request, expected, args, seed):
+    """Задержки одного клиента и пропускная способность args.concurrency клиентов"""
+    client = app.test_client()
+    rng = random.Random(seed)
+    for _ in range(args.warmup):
+        timed_request(client, make_request, rng)
+
+    latencies, errors = [], 0
+    for _ in range(args.requests):
+        elapsed, status = timed_request(client, make_request, rng)
+        latencies.append(elapsed)
+        errors += status != expected
+
+    lock = threading.Lock()
+    remaining = [args.requests]
+    failed = [0]
+
+    def worker(thread_seed):
+        thread_client = app.test_client()
+        thread_rng = random.Random(thread_seed)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            _, status = timed_request(thread_client, make_request, thread_rng)
+            if status != expected:
+                with lock:
+                    failed[0] += 1
+
+    threads = [threading.Thread(target=worker, args=(f'{seed}:{i}',)) for i in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': args.requests,
+        'errors': errors + failed[0],
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p90_ms': round(percentile(latencies, 90), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'rps': round(args.requests / elapsed, 1),
+        'concurrency': args.concurrency,
+    }
+
+
+def measure(args):
+    """Дочерний процесс: замеры всех маршрутов на БД из DATABASE_URL"""
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault('INIT_DB_ON_STARTUP', 'false')
+
+    import migrations
+    import app_extended
+
+    app = app_extended.app
+    rng = random.Random(args.seed)
+    with app.app_context():
+        migrations.upgrade(app_extended.db.engine, log=lambda message: None)
+        fixtures = load_fixtures(app_extended, rng)
+    routes = build_routes(fixtures, args.password)
+
+    # Как воркер gunicorn после post_worker_init: снимок и индекс готовы до замеров,
+    # а не строятся в фоне во время них (load_fixtures меняет остатки товаров)
+    if app_extended.catalog_snapshot is not None:
+        app_extended.catalog_snapshot.rebuild()
+    if app_extended.search_index.begin_refresh():
+        app_extended.refresh_search_index()
+
+    results = []
+    for name, (expected, make_request) in routes.items():
+        if args.routes and name not in args.routes:
+            continue
+        result = measure_route(app, make_request, expected, args, seed=f'{args.seed}:{name}')
+        results.append({'database': args.database, 'scale': args.scale, 'route': name, **result})
+        print(f"   {name:22} p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+              f"{result['rps']:8.1f} rps  ошибок {result['errors']}", file=sys.stderr, flush=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f)
+    return 0
+
+
+# ============================================================================
+# ПОДГОТОВКА ДАННЫХ И ЗАПУСК
+# ============================================================================
+
+def generate(database_url, scale, seed):
+    subprocess.run(
+        [sys.executable, os.path.join(BACKEND_DIR, 'generate_data.py'), '--scale', scale, '--seed', str(seed)],
+        env={**os.environ, 'DATABASE_URL': database_url}, check=True
+    )
+
+
+def prepare_sqlite(data_dir, scale, seed):
+    """Копия заполненной SQLite-базы; сама база создается один раз на (масштаб, seed)"""
+    os.makedirs(data_dir, exist_ok=True)
+    pristine = os.path.join(data_dir, f'{scale}-{seed}.db')
+    if not os.path.exists(pristine):
+        partial = pristine + '.partial'
+        if os.path.exists(partial):
+            os.remove(partial)
+        generate('sqlite:///' + partial, scale, seed)
+        os.replace(partial, pristine)
+    work = os.path.join(data_dir, f'{scale}-{seed}.work.db')
+    shutil.copyfile(pristine, work)
+    return 'sqlite:///' + work
+
+
+def postgres_available(url):
+    import sqlalchemy as sa
+    try:
+        engine = sa.create_engine(url)
+        with engine.connect():
+            pass
+        engine.dispose()
+        return True
+    except Exception as e:
+        print(f"⚠️ PostgreSQL недоступен, пропускаю: {str(e).splitlines()[0]}", file=sys.stderr)
+        return False
+
+
+def prepare_postgres(url, scale, seed):
+    import sqlalchemy as sa
+    engine = sa.create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(sa.text('DROP SCHEMA public CASCADE'))
+        conn.execute(sa.text('CREATE SCHEMA public'))
+    engine.dispose()
+    generate(url, scale, seed)
+    return url
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    targets = [('sqlite', None)]
+    postgres_url = args.postgres or os.getenv('BENCH_POSTGRES_URL')
+    if postgres_url and postgres_available(postgres_url):
+        targets.append(('postgresql', postgres_url))
+
+    env = dict(os.environ, INIT_DB_ON_STARTUP='false')
+    if args.no_cache:
+        env['CATALOG_CACHE_TTL'] = '0'
+    if args.no_snapshot:
+        env['CATALOG_SNAPSHOT'] = 'False'
+
+    results = []
+    for database, url in targets:
+        for scale in args.scales:
+            print(f"🔄 {database}, {scale}: подготовка данных", file=sys.stderr, flush=True)
+            if database == 'sqlite':
+                database_url = prepare_sqlite(args.data_dir, scale, args.seed)
+            else:
+                database_url = prepare_postgres(url, scale, args.seed)
+
+            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as tmp:
+                output = tmp.name
+            try:
+                command = [
+                    sys.executable, os.path.abspath(__file__), 'measure',
+                    '--database', database, '--scale', scale, '--seed', str(args.seed),
+                    '--requests', str(args.requests), '--warmup', str(args.warmup),
+                    '--concurrency', str(args.concurrency), '--password', args.password,
+                    '--output', output, *(['--routes', *args.routes] if args.routes else [])
+                ]
+                subprocess.run(command, env=dict(env, DATABASE_URL=database_url), check=True)
+                with open(output) as f:
+                    results.extend(json.load(f))
+            finally:
+                os.remove(output)
+
+    report = {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'cache': not args.no_cache,
+            'snapshot': not args.no_snapshot,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ Результаты: {args.output}", file=sys.stderr)
+    return 0
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    def key(row):
+        return row['database'], row['scale'], row['route']
+
+    before = {key(row): row for row in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        old = before.get(key(row))
+        if old is None:
+            print(f"   {'/'.join(key(row)):45} новый маршрут")
+            continue
+
+        metric = args.metric
+        ratio = row[metric] / old[metric] if old[metric] else float('inf')
+        rps_ratio = row['rps'] / old['rps'] if old['rps'] else 1.0
+        slower = ratio > 1 + args.threshold and row[metric] - old[metric] > args.min_delta_ms
+        weaker = rps_ratio < 1 - args.threshold
+        mark = '❌' if slower or weaker else '✅'
+        print(f"{mark} {'/'.join(key(row)):45} {metric} {old[metric]:8.2f} -> {row[metric]:8.2f} ms "
+              f"({ratio - 1:+.0%})  rps {old['rps']:8.1f} -> {row['rps']:8.1f} ({rps_ratio - 1:+.0%})")
+        if slower or weaker:
+            regressions.append(key(row))
+
+    if regressions:
+        print(f"❌ Регрессий: {len(regressions)}")
+        return 1
+    print("✅ Регрессий нет")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_measure_options(command):
+        command.add_argument('--requests', type=int, default=200, help='запросов на маршрут')
+        command.add_argument('--warmup', type=int, default=20)
+        command.add_argument('--concurrency', type=int, default=8, help='клиентов при замере пропускной способности')
+        command.add_argument('--seed', type=int, default=42)
+        command.add_argument('--password', default='password123', help='пароль пользователей generate_data.py')
+        command.add_argument('--routes', nargs='+', help='только эти маршруты (например, products.list)')
+
+    run_parser = commands.add_parser('run', help='выполнить замеры')
+    run_parser.add_argument('--scales', nargs='+', default=['small'], help='масштабы generate_data.py')
+    run_parser.add_argument('--postgres', help='URL отдельной БД PostgreSQL (будет очищена)')
+    run_parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'lumme_bench'))
+    run_parser.add_argument('--no-snapshot', action='store_true', help='выключить снимок каталога (CATALOG_SNAPSHOT)')
+    run_parser.add_argument('--no-cache', action='store_true', help='выключить кэш каталога (CATALOG_CACHE_TTL=0)')
+    run_parser.add_argument('--output', default='benchmark_results.json')
+    add_measure_options(run_parser)
+
+    measure_parser = commands.add_parser('measure', help='(внутренняя) замеры на БД из DATABASE_URL')
+    measure_parser.add_argument('--database', required=True)
+    measure_parser.add_argument('--scale', required=True)
+    measure_parser.add_argument('--output', required=True)
+    add_measure_options(measure_parser)
+
+    compare_parser = commands.add_parser('compare', help='сравнить два файла результатов')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--metric', choices=('p50_ms', 'p90_ms', 'p99_ms', 'mean_ms'), default='p90_ms')
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help='допустимое относительное ухудшение')
+    compare_parser.add_argument('--min-delta-ms', type=float, default=1.0, help='игнорировать рост меньше этого')
+
+    args = parser.parse_args()
+    return {'run': run, 'measure': measure, 'compare': compare}[args.command](args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Смешанная нагрузка: вход пользователей и чтение каталога
+
+Параллельно выполняются логины (дорогое хеширование пароля) и запросы
+GET /api/products. Показывает пропускную способность входа и задержку
+каталога, чтобы сравнить политики хеширования и режимы воркеров:
+
+    gunicorn app_extended:app --bind 0.0.0.0:8000
+    python benchmarks/login_mixed_load.py --url http://localhost:8000 --duration 15
+
+Повторите с GUNICORN_WORKER_CLASS=sync, PASSWORD_HASH_WORKERS=2,
+PASSWORD_HASH_METHOD=... и сравните результаты.
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+
+import requests
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def worker(session_factory, make_request, deadline, latencies, statuses, lock):
+    session = session_factory()
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            status = make_request(session).status_code
+        except requests.RequestException:
+            status = 'error'
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+
+def summarize(name, latencies, statuses, duration):
+    ms = [value * 1000 for value in latencies]
+    return {
+        'route': name,
+        'requests': len(latencies),
+        'throughput': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(ms, 50), 1) if ms else None,
+        'p95_ms': round(percentile(ms, 95), 1) if ms else None,
+        'p99_ms': round(percentile(ms, 99), 1) if ms else None,
+        'mean_ms': round(statistics.mean(ms), 1) if ms else None,
+        'statuses': statuses
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--duration', type=float, default=10, help='длительность, секунды')
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--catalog-threads', type=int, default=4)
+    parser.add_argument('--email', default='customer1@lumme.tj')
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    api = args.url.rstrip('/') + '/api'
+    credentials = {'email': args.email, 'password': args.password}
+    routes = {
+        'login': (args.login_threads, lambda s: s.post(f'{api}/auth/login', json=credentials)),
+        'catalog': (args.catalog_threads, lambda s: s.get(f'{api}/products', params={'per_page': 12}))
+    }
+
+    results = {name: ([], {}) for name in routes}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = []
+    for name, (count, make_request) in routes.items():
+        latencies, statuses = results[name]
+        for _ in range(count):
+            threads.append(threading.Thread(
+                target=worker,
+                args=(requests.Session, make_request, deadline, latencies, statuses, lock)
+            ))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = [summarize(name, *results[name], args.duration) for name in routes]
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    for row in report:
+        print(f"{row['route']:8} {row['throughput']:8.1f} req/s  "
+              f"p50 {row['p50_ms']} ms  p95 {row['p95_ms']} ms  p99 {row['p99_ms']} ms  {row['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
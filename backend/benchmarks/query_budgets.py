@@ -0,0 +1,168 @@
+"""
+Проверка бюджетов SQL-запросов маршрутов API (@query_budget)
+
+Каждый маршрут с объявленным бюджетом вызывается на данных generate_data.py
+с разными размерами страниц (N+1 проявляется как рост числа запросов
+с размером страницы) и дважды подряд (холодный и прогретый воркер).
+Конфигурация - по умолчанию, как в production (кэш, снимок каталога,
+поисковый индекс): холодный воркер читает БД, пока снимок и индекс
+собираются в фоне. Код возврата 1, если хотя бы один запрос превысил
+бюджет или завершился ошибкой.
+
+    python benchmarks/query_budgets.py
+    DATABASE_URL=postgresql://.../lumme_budgets python benchmarks/query_budgets.py
+
+Без DATABASE_URL создается временная SQLite БД. Пустая БД заполняется
+generate_data.py (небольшой набор), заполненная используется как есть.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('INIT_DB_ON_STARTUP', 'false')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'query_budgets.db'))
+os.environ.setdefault('CATALOG_SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(), 'query_budgets.snapshot'))
+os.environ.update(QUERY_STATS_HEADERS='True', QUERY_BUDGET_MODE='raise')
+
+import migrations
+from app_extended import app, db, create_user_token, User, Customer, Product, Order, OrderItem
+from query_stats import QueryBudgetExceeded
+
+# Небольшой набор generate_data.py: заказов достаточно, чтобы страницы были полными
+DATASET = ['--sellers', '5', '--customers', '50', '--products', '300', '--orders', '3000']
+
+
+def seed():
+    with app.app_context():
+        migrations.upgrade(db.engine, log=lambda message: None)
+        if db.session.query(User.id).first() is not None:
+            return
+    subprocess.run(
+        [sys.executable, os.path.join(BACKEND_DIR, 'generate_data.py'), *DATASET],
+        env=os.environ, check=True
+    )
+
+
+def scenarios():
+    """Запросы проверки: (метод, путь, параметры test_client)"""
+    with app.app_context():
+        customer_user, order_id, product_id, seller_user = db.session.query(
+            Customer.user_id, Order.id, OrderItem.product_id, User.id
+        ).join(Order, Order.customer_id == Customer.id).join(
+            OrderItem, OrderItem.order_id == Order.id
+        ).join(Product, Product.id == OrderItem.product_id).join(
+            User, User.seller.has(id=Order.seller_id)
+        ).filter(Product.is_in_stock == True).order_by(Product.review_count.desc()).first()
+
+        stocked = [product_id for (product_id,) in db.session.query(Product.id).filter(
+            Product.seller.has(user_id=seller_user), Product.is_in_stock == True
+        ).limit(3)]
+        db.session.execute(db.update(Product).where(Product.id.in_(stocked)).values(stock_quantity=1000))
+        db.session.commit()
+
+        customer = {'Authorization': f'Bearer {create_user_token(db.session.get(User, customer_user))}'}
+        seller = {'Authorization': f'Bearer {create_user_token(db.session.get(User, seller_user))}'}
+        email = db.session.get(User, customer_user).email
+
+    delivery_date = (date.today() + timedelta(days=2)).isoformat()
+    requests = [('POST', '/api/auth/login', {'json': {'email': email, 'password': 'password123'}})]
+    for per_page in (5, 50):
+        requests += [
+            ('GET', '/api/products', {'query_string': {'per_page': per_page}}),
+            ('GET', '/api/products', {'query_string': {'per_page': per_page, 'sort': 'popular', 'cursor': ''}}),
+            ('GET', '/api/products/search', {'query_string': {'q': 'розы', 'per_page': per_page}}),
+            ('GET', f'/api/products/{product_id}/reviews', {'query_string': {'per_page': per_page}}),
+            ('GET', '/api/orders', {'query_string': {'per_page': per_page}, 'headers': customer}),
+            ('GET', '/api/orders', {'query_string': {'per_page': per_page}, 'headers': seller}),
+        ]
+    requests += [
+        ('GET', '/api/products/facets', {}),
+        ('GET', '/api/products/suggest', {'query_string': {'q': 'ро'}}),
+        ('GET', f'/api/products/{product_id}', {}),
+        ('GET', '/api/orders/summary', {'headers': seller}),
+        ('POST', '/api/orders', {'headers': customer, 'json': {
+            'items': [{'id': stocked[0], 'quantity': 1}],
+            'delivery_address': 'Душанбе, ул. Рудаки, 1', 'delivery_date': delivery_date
+        }}),
+        ('POST', '/api/orders', {'headers': customer, 'json': {
+            'items': [{'id': product, 'quantity': 1} for product in stocked],
+            'delivery_address': 'Душанбе, ул. Рудаки, 1', 'delivery_date': delivery_date
+        }}),
+        ('POST', '/api/reviews', {'headers': customer, 'json': {
+            'order_id': order_id, 'product_id': product_id, 'rating': 5
+        }}),
+        ('PUT', f'/api/orders/{order_id}/status', {'headers': seller, 'json': {'status': 'delivered'}}),
+        ('PATCH', '/api/products', {'headers': seller, 'json': {'items': [{'id': stocked[0], 'price': 500}]}}),
+    ]
+    return requests, seller
+
+
+def product_lifecycle(client, seller):
+    """Создание, изменение и удаление товара (удаляется созданный здесь же товар)"""
+    response = client.post('/api/products', headers=seller, json={'name': 'Проверка бюджета', 'price': 100, 'stock_quantity': 1})
+    yield 'POST', '/api/products', response
+    product_id = response.get_json()['data']['id']
+    yield 'PUT', f'/api/products/{product_id}', client.put(f'/api/products/{product_id}', headers=seller, json={'price': 120})
+    yield 'DELETE', f'/api/products/{product_id}', client.delete(f'/api/products/{product_id}', headers=seller)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    seed()
+    app.testing = True  # QueryBudgetExceeded доходит до test_client
+    client = app.test_client()
+    requests, seller = scenarios()
+
+    failures = []
+
+    def report(method, path, response=None, error=None):
+        if error is not None:
+            failures.append(f'{method} {path}: {error}')
+            print(f'❌ {method:6} {path:45} {error}')
+            return
+        count = response.headers.get('X-Query-Count')
+        budget = response.headers.get('X-Query-Budget', '-')
+        mark = '✅'
+        if response.status_code >= 400:
+            mark = '❌'
+            failures.append(f'{method} {path}: HTTP {response.status_code}')
+        print(f"{mark} {method:6} {path:45} {response.status_code}  запросов {count:>2} / {budget:>2}  "
+              f"{response.headers.get('X-DB-Time')} мс")
+
+    for attempt in ('холодный', 'прогретый'):
+        print(f'--- {attempt} воркер')
+        for method, path, kwargs in requests:
+            try:
+                report(method, path, client.open(path, method=method, **kwargs))
+            except QueryBudgetExceeded as e:
+                report(method, path, error=str(e))
+        try:
+            for method, path, response in product_lifecycle(client, seller):
+                report(method, path, response)
+        except QueryBudgetExceeded as e:
+            report('', '', error=str(e))
+
+    uncovered = sorted(
+        rule.rule for rule in app.url_map.iter_rules()
+        if rule.rule.startswith('/api/') and getattr(app.view_functions[rule.endpoint], 'query_budget', None) is None
+    )
+    if uncovered:
+        print(f"ℹ️ Маршруты без бюджета: {', '.join(uncovered)}")
+
+    if failures:
+        print(f'❌ Нарушений: {len(failures)}')
+        return 1
+    print('✅ Все маршруты уложились в бюджет запросов')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Нагрузочная проверка оформления заказов (POST /api/orders)
+
+Много параллельных покупателей заказывают один и тот же букет.
+Остаток не должен уйти в минус, а число успешных заказов должно
+совпасть с начальным остатком. Код возврата 1 при перепродаже.
+
+    DATABASE_URL=postgresql://... python benchmarks/stress_orders.py --stock 50 --threads 16 --orders 10
+
+SQLite сериализует запись, поэтому реальную конкуренцию проверяет только PostgreSQL.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('INIT_DB_ON_STARTUP', 'false')
+
+import migrations
+from app_extended import app, db, create_user_token, User, Seller, Customer, Product, OrderItem
+
+
+def setup(stock, customers):
+    """Создать продавца, букет с заданным остатком и покупателей; вернуть id и токены"""
+    run_id = uuid.uuid4().hex[:8]
+    seller_user = User(email=f'stress-seller-{run_id}@lumme.tj', password_hash='!', user_type='seller')
+    db.session.add(seller_user)
+    db.session.flush()
+
+    seller = Seller(user_id=seller_user.id, shop_name=f'Stress {run_id}')
+    db.session.add(seller)
+    db.session.flush()
+
+    product = Product(
+        seller_id=seller.id,
+        name=f'Стресс-букет {run_id}',
+        price=100,
+        stock_quantity=stock,
+        is_in_stock=stock > 0
+    )
+    db.session.add(product)
+
+    users = []
+    for i in range(customers):
+        user = User(email=f'stress-{run_id}-{i}@lumme.tj', password_hash='!', user_type='customer')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Customer(user_id=user.id))
+        users.append(user)
+
+    db.session.commit()
+    tokens = [create_user_token(user) for user in users]
+    return product.id, [seller_user.id] + [user.id for user in users], tokens
+
+
+def place_orders(product_id, token, orders, barrier, statuses, lock):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    body = {
+        'items': [{'id': product_id, 'quantity': 1}],
+        'delivery_address': 'Душанбе, ул. Рудаки, 1',
+        'delivery_date': '2026-02-14'
+    }
+
+    barrier.wait()
+    for _ in range(orders):
+        status = client.post('/api/orders', json=body, headers=headers).status_code
+        with lock:
+            statuses[status] += 1
+
+
+def cleanup(user_ids):
+    for user_id in user_ids:
+        user = db.session.get(User, user_id)
+        if user:
+            db.session.delete(user)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stock', type=int, default=50, help='начальный остаток букета')
+    parser.add_argument('--threads', type=int, default=16, help='параллельных покупателей')
+    parser.add_argument('--orders', type=int, default=10, help='заказов на покупателя')
+    parser.add_argument('--keep', action='store_true', help='не удалять созданные данные')
+    args = parser.parse_args()
+
+    with app.app_context():
+        migrations.upgrade(db.engine, log=lambda message: None)
+        product_id, user_ids, tokens = setup(args.stock, args.threads)
+
+    statuses = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.threads)
+    threads = [
+        threading.Thread(target=place_orders, args=(product_id, token, args.orders, barrier, statuses, lock))
+        for token in tokens
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        stock_left = db.session.get(Product, product_id).stock_quantity
+        sold = db.session.query(db.func.coalesce(db.func.sum(OrderItem.quantity), 0)).filter(
+            OrderItem.product_id == product_id
+        ).scalar()
+        if not args.keep:
+            cleanup(user_ids)
+
+    attempts = args.threads * args.orders
+    print(f"Попыток: {attempts}, за {elapsed:.2f} с ({attempts / elapsed:.0f} заказов/с)")
+    print(f"Статусы: {dict(statuses)}")
+    print(f"Продано: {sold}, остаток: {stock_left}, начальный остаток: {args.stock}")
+
+    oversold = stock_left < 0 or sold > args.stock or statuses[201] != sold or sold + stock_left != args.stock
+    if oversold:
+        print("❌ Нарушена согласованность остатков")
+        return 1
+
+    print("✅ Остатки согласованы")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
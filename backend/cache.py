@@ -0,0 +1,164 @@
+"""
+Кэш каталога Lumme
+Внутрипроцессный LRU/TTL кэш для ответов GET /api/products
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Маркер отсутствующего товара (негативное кэширование)
+MISSING = object()
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кэш с ограничением времени жизни записей"""
+
+    def __init__(self, maxsize=1024, ttl=60, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Вернуть значение по ключу или default, если записи нет или она устарела"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= self.timer():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Сохранить значение; при переполнении вытесняется самая старая запись"""
+        expires_at = self.timer() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CatalogCache:
+    """
+    Версионированный кэш каталога.
+
+    Ключи списков и карточек товаров содержат номер версии каталога,
+    поэтому invalidate() лишь увеличивает версию: старые записи становятся
+    недостижимыми и вытесняются по LRU/TTL. Кэш локален для процесса,
+    расхождение между воркерами gunicorn ограничено TTL.
+
+    Запрос запоминает version до чтения данных и передает ее в set_*:
+    ответ, собранный до invalidate(), не попадает под новую версию.
+    """
+
+    def __init__(self, maxsize=2048, ttl=60, negative_ttl=10):
+        self.negative_ttl = negative_ttl
+        self.version = 0
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _get(self, key):
+        return self._entries.get((self.version,) + key)
+
+    def _set(self, key, value, version, ttl=None):
+        # Каталог изменился после чтения: запись под старой версией никто не прочитает
+        if version == self.version:
+            self._entries.set((version,) + key, value, ttl=ttl)
+
+    def get_list(self, filters):
+        """Получить страницу каталога по кортежу фильтров"""
+        return self._get(('list', filters))
+
+    def set_list(self, filters, payload, version):
+        self._set(('list', filters), payload, version)
+
+    def get_count(self, filters):
+        """Получить закэшированное количество товаров для набора фильтров"""
+        return self._get(('count', filters))
+
+    def set_count(self, filters, total, version):
+        self._set(('count', filters), total, version)
+
+    def get_facets(self, key):
+        """Получить закэшированные данные фасетов каталога"""
+        return self._get(('facets', key))
+
+    def set_facets(self, key, payload, version):
+        self._set(('facets', key), payload, version)
+
+    def get_product(self, product_id):
+        """Получить карточку товара; MISSING означает закэшированное отсутствие"""
+        return self._get(('product', product_id))
+
+    def set_product(self, product_id, payload, version):
+        self._set(('product', product_id), payload, version)
+
+    def set_missing(self, product_id, version):
+        self._set(('product', product_id), MISSING, version, ttl=self.negative_ttl)
+
+    def invalidate_product(self, product_id):
+        """Сбросить только карточку товара, не трогая списки"""
+        self._entries.pop((self.version, 'product', product_id))
+
+    def invalidate(self):
+        """Сбросить весь каталог (создание, изменение, удаление товаров)"""
+        self.version += 1
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'size': len(self._entries),
+            'hits': self._entries.hits,
+            'misses': self._entries.misses
+        }
+
+
+class TimedSnapshot:
+    """Результат loader(), перечитываемый не чаще одного раза в ttl секунд"""
+
+    def __init__(self, loader, ttl=30, timer=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.timer = timer
+        self._value = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._expires_at <= self.timer():
+                self._value = self.loader()
+                self._expires_at = self.timer() + self.ttl
+            return self._value
+
+    def peek(self):
+        """Последнее загруженное значение без перечитывания (None до первой загрузки)"""
+        return self._value
+
+    def reset(self):
+        """Перечитать значение при следующем обращении"""
+        with self._lock:
+            self._expires_at = 0
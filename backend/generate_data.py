@@ -0,0 +1,524 @@
+"""
+Генератор синтетических данных Lumme в масштабе продакшена
+
+    python generate_data.py --scale small
+    python generate_data.py --scale large --seed 7
+    python generate_data.py --sellers 1000 --customers 200000 --products 200000 --orders 5000000
+
+Создает продавцов, покупателей, товары, заказы с позициями и отзывы.
+Одинаковые --seed и размеры дают одинаковые данные: у каждой таблицы свой
+генератор случайных чисел, время отсчитывается от --until, а не от текущей
+даты. Строки пишутся пакетами: COPY на PostgreSQL (psycopg2), многострочная
+вставка на остальных БД. Пароль у всех пользователей один (--password) и
+хешируется один раз.
+
+Нужна пустая БД (id назначаются с 1), схема создается миграциями. Агрегаты
+(рейтинги, продажи, суммы покупателей) пересчитываются групповыми запросами
+после загрузки.
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ['INIT_DB_ON_STARTUP'] = 'false'
+# Пересчет агрегатов по всем заказам не ограничивается statement_timeout
+os.environ.setdefault('DB_STATEMENT_TIMEOUT_MS', '0')
+# Пакетная загрузка - не медленные запросы приложения: журнал с EXPLAIN выключен
+os.environ['SLOW_QUERY_MS'] = '0'
+
+import migrations
+from app_extended import (
+    app, db, password_hasher, rebuild_rating_aggregates,
+    User, Seller, Customer, Product, Order, OrderItem, Review
+)
+
+# Размеры наборов: продавцы, покупатели, товары, заказы
+SCALES = {
+    'small': {'sellers': 20, 'customers': 2_000, 'products': 2_000, 'orders': 20_000},
+    'medium': {'sellers': 200, 'customers': 50_000, 'products': 40_000, 'orders': 500_000},
+    'large': {'sellers': 1_000, 'customers': 200_000, 'products': 200_000, 'orders': 5_000_000},
+}
+
+DELIVERY_FEE = 50
+
+FIRST_NAMES = (
+    ('Фарход', 'Рустам', 'Джамшед', 'Бахтиёр', 'Алишер', 'Дилшод', 'Сухроб', 'Фирдавс', 'Искандар', 'Умед'),
+    ('Зарина', 'Мадина', 'Нигина', 'Фарангис', 'Шахноза', 'Малика', 'Дилноза', 'Гулноза', 'Сабина', 'Парвина'),
+)
+LAST_NAMES = ('Хамидов', 'Миров', 'Рахимов', 'Каримов', 'Саидов', 'Назаров', 'Шарипов', 'Юсупов', 'Одинаев', 'Махмудов')
+STREETS = ('Айни', 'Сомони', 'Рудаки', 'Шотемур', 'Бохтар', 'Хусейнзода', 'Пушкина', 'Мирзо Турсунзаде', 'Лохути', 'Фирдавси')
+CITIES = ('Душанбе', 'Душанбе', 'Душанбе', 'Худжанд', 'Бохтар', 'Куляб')
+
+SHOP_WORDS = (('Цветочный', 'Розовый', 'Весенний', 'Садовый', 'Нежный', 'Летний'), ('рай', 'сад', 'букет', 'дом', 'уголок', 'мир'))
+
+OCCASIONS = ('birthday', 'wedding', 'anniversary', 'love', 'congratulations', None)
+OCCASION_WEIGHTS = (30, 10, 12, 25, 15, 8)
+SIZES = ('small', 'medium', 'large')
+SIZE_WEIGHTS = (30, 50, 20)
+
+# Цветы: (именительный мн. ч., родительный мн. ч.) - для названий и состава
+FLOWERS = (
+    ('Розы', 'роз'), ('Тюльпаны', 'тюльпанов'), ('Пионы', 'пионов'), ('Хризантемы', 'хризантем'),
+    ('Лилии', 'лилий'), ('Ромашки', 'ромашек'), ('Гортензии', 'гортензий'), ('Эустомы', 'эустом'),
+    ('Гвоздики', 'гвоздик'), ('Ирисы', 'ирисов'), ('Орхидеи', 'орхидей'), ('Подсолнухи', 'подсолнухов'),
+)
+FLOWER_WEIGHTS = (40, 15, 8, 8, 6, 5, 4, 4, 4, 2, 2, 2)
+COLORS = ('красных', 'белых', 'розовых', 'желтых', 'кремовых', 'сиреневых', 'бордовых', 'оранжевых')
+EXTRAS = ('зелень', 'эвкалипт', 'гипсофила', 'рускус', 'писташ', 'лента', 'крафт')
+BOUQUET_WORDS = ('Букет', 'Букет', 'Композиция', 'Корзина', 'Коробка')
+DESCRIPTIONS = (
+    'Свежие цветы, собранные в день доставки',
+    'Идеальный подарок для близкого человека',
+    'Авторская работа наших флористов',
+    'Нежная композиция в пастельных тонах',
+    'Яркий букет для особого повода',
+)
+IMAGES = (
+    'https://images.unsplash.com/photo-1518895949257-7621c3c786d7?w=500',
+    'https://images.unsplash.com/photo-1561181286-d3fee7d55364?w=500&h=500&fit=crop',
+    'https://images.unsplash.com/photo-1490750967868-88aa4486c946?w=500',
+    'https://images.unsplash.com/photo-1487070183336-b863922373d4?w=500',
+)
+MESSAGES = ('С днем рождения!', 'Люблю тебя', 'Поздравляю!', 'Спасибо за все', 'С годовщиной!')
+REVIEW_TEXTS = (
+    'Очень красивый букет, спасибо!', 'Доставили вовремя, цветы свежие', 'Все понравилось',
+    'Букет меньше, чем на фото', 'Отличный магазин, закажу еще', 'Цветы простояли две недели',
+)
+STAR_WEIGHTS = (3, 3, 8, 26, 60)
+
+
+def cumulative(weights):
+    total, result = 0, []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+def zipf_weights(count, rng, exponent=0.9):
+    """Накопленные веса популярности: несколько хитов и длинный хвост, ранги перемешаны"""
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    return cumulative(1 / rank ** exponent for rank in ranks)
+
+
+def person(rng):
+    female = rng.random() < 0.5
+    last_name = rng.choice(LAST_NAMES)
+    return rng.choice(FIRST_NAMES[female]), last_name + 'а' if female else last_name
+
+
+def phone(rng):
+    return f'+992 9{rng.randrange(10 ** 8):08d}'
+
+
+def address(customer_id):
+    """Адрес покупателя - функция от id, чтобы не хранить адреса всех покупателей"""
+    return f'ул. {STREETS[customer_id % len(STREETS)]}, {customer_id % 199 + 1}, {CITIES[customer_id % len(CITIES)]}'
+
+
+class BulkWriter:
+    """Пакетная запись строк: COPY на psycopg2, executemany на остальных драйверах"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.copy = conn.dialect.driver == 'psycopg2'
+
+    def write(self, model, rows):
+        if not rows:
+            return
+        table = model.__table__
+        if self.copy:
+            self._copy(table, rows)
+        else:
+            self.conn.execute(table.insert(), rows)
+        self.conn.commit()
+
+    def _copy(self, table, rows):
+        columns = list(rows[0])
+        is_json = [isinstance(table.c[column].type, db.JSON) for column in columns]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[column], json_column) for column, json_column in zip(columns, is_json)])
+        buffer.seek(0)
+        cursor = self.conn.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+
+def _copy_value(value, json_column):
+    # Пустое поле без кавычек в COPY csv - NULL
+    if json_column and value is not None:
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return value
+
+
+class Generator:
+    def __init__(self, args, writer, log):
+        self.args = args
+        self.writer = writer
+        self.log = log
+        self.until = datetime.strptime(args.until, '%Y-%m-%d')
+        self.since = self.until - timedelta(days=args.days)
+        self.password_hash = password_hasher.hash(args.password)
+
+    def rng(self, table):
+        # Отдельный генератор на таблицу: размер одной таблицы не меняет данные других
+        return random.Random(f'{self.args.seed}:{table}')
+
+    def write_batches(self, model, rows):
+        count, batch = 0, []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.args.batch_size:
+                self.writer.write(model, batch)
+                count += len(batch)
+                batch = []
+        self.writer.write(model, batch)
+        return count + len(batch)
+
+    def users(self):
+        rng = self.rng('users')
+        sellers, customers = self.args.sellers, self.args.customers
+        for user_id in range(1, sellers + customers + 1):
+            is_seller = user_id <= sellers
+            number = user_id if is_seller else user_id - sellers
+            first_name, last_name = person(rng)
+            created_at = self.since - timedelta(days=60) + timedelta(seconds=rng.randrange(self.args.days * 86400))
+            yield {
+                'id': user_id,
+                'email': f"{'seller' if is_seller else 'customer'}{number}@lumme.test",
+                'password_hash': self.password_hash,
+                'first_name': first_name,
+                'last_name': last_name,
+                'phone': phone(rng),
+                'user_type': 'seller' if is_seller else 'customer',
+                'is_active': True,
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+
+    def sellers(self):
+        rng = self.rng('sellers')
+        for seller_id in range(1, self.args.sellers + 1):
+            created_at = self.since - timedelta(days=60)
+            yield {
+                'id': seller_id,
+                'user_id': seller_id,
+                'shop_name': f'{rng.choice(SHOP_WORDS[0])} {rng.choice(SHOP_WORDS[1])} №{seller_id}',
+                'shop_description': rng.choice(DESCRIPTIONS),
+                'shop_address': address(seller_id),
+                'shop_phone': phone(rng),
+                'rating': 0.0,
+                'total_sales': 0,
+                'is_verified': rng.random() < 0.7,
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+
+    def customers(self):
+        for customer_id in range(1, self.args.customers + 1):
+            created_at = self.since - timedelta(days=60)
+            yield {
+                'id': customer_id,
+                'user_id': self.args.sellers + customer_id,
+                'default_address': address(customer_id),
+                'delivery_addresses': [address(customer_id)],
+                'total_orders': 0,
+                'total_spent': 0.0,
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+
+    def plan_catalog(self):
+        """
+        Разбить товары между продавцами (у крупных магазинов больше товаров)
+        и выбрать цены. Товары продавца занимают непрерывный диапазон id.
+        """
+        rng = self.rng('catalog')
+        sellers, products = self.args.sellers, self.args.products
+        shares = [rng.paretovariate(1.5) for _ in range(sellers)]
+        scale = (products - sellers) / sum(shares)
+        counts = [1 + int(share * scale) for share in shares]
+        counts[-1] += products - sum(counts)  # остаток от округления
+
+        self.seller_start = array('l', [0] * (sellers + 2))
+        start = 1
+        for seller_id, count in enumerate(counts, 1):
+            self.seller_start[seller_id] = start
+            start += count
+        self.seller_start[sellers + 1] = start
+        self.product_seller = array('l', [0])
+        for seller_id, count in enumerate(counts, 1):
+            self.product_seller.extend([seller_id] * count)
+
+        # Цены - логнормальное распределение около 400, с округлением до 10
+        self.prices = array('d', [0.0])
+        self.prices.extend(max(50.0, round(rng.lognormvariate(math.log(400), 0.5), -1)) for _ in range(products))
+        self.popularity = zipf_weights(products, rng)
+        self.customer_activity = zipf_weights(self.args.customers, rng, exponent=0.6)
+
+    def products(self):
+        rng = self.rng('products')
+        flower_weights = cumulative(FLOWER_WEIGHTS)
+        for product_id in range(1, self.args.products + 1):
+            flower, flower_genitive = rng.choices(FLOWERS, cum_weights=flower_weights)[0]
+            stems = rng.choice((5, 7, 9, 11, 15, 21, 25, 35, 51, 101))
+            color = rng.choice(COLORS)
+            if rng.random() < 0.6:
+                name = f'{rng.choice(BOUQUET_WORDS)} из {stems} {color} {flower_genitive}'
+            else:
+                name = f'{flower} {stems} шт'
+            created_at = self.since - timedelta(days=60) + timedelta(seconds=rng.randrange((self.args.days + 60) * 86400))
+            stock = 0 if rng.random() < 0.1 else rng.randint(1, 50)
+            yield {
+                'id': product_id,
+                'seller_id': self.product_seller[product_id],
+                'name': name,
+                'description': rng.choice(DESCRIPTIONS),
+                'price': self.prices[product_id],
+                'composition': f'{stems} {color} {flower_genitive}, {rng.choice(EXTRAS)}',
+                'occasion': rng.choices(OCCASIONS, weights=OCCASION_WEIGHTS)[0],
+                'size': rng.choices(SIZES, weights=SIZE_WEIGHTS)[0],
+                'stock_quantity': stock,
+                'is_in_stock': stock > 0,
+                'rating': 0.0,
+                'review_count': 0,
+                'sold_count': 0,
+                'image_url': rng.choice(IMAGES),
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+
+    def orders(self):
+        """
+        Заказы в хронологическом порядке (id растет вместе с created_at),
+        плотность растет со временем. Выдает (заказ, позиции, отзывы).
+        """
+        rng = self.rng('orders')
+        count = self.args.orders
+        span = (self.until - self.since).total_seconds()
+        products = range(1, self.args.products + 1)
+        customers = range(1, self.args.customers + 1)
+        item_id = review_id = 0
+
+        for order_id in range(1, count + 1):
+            created_at = self.since + timedelta(seconds=span * math.sqrt((order_id - 1 + rng.random()) / count))
+            customer_id = rng.choices(customers, cum_weights=self.customer_activity)[0]
+            first = rng.choices(products, cum_weights=self.popularity)[0]
+            seller_id = self.product_seller[first]
+            start, end = self.seller_start[seller_id], self.seller_start[seller_id + 1]
+
+            # Остальные позиции - из ассортимента того же продавца
+            product_ids = [first]
+            for _ in range(rng.choices((0, 1, 2), weights=(60, 30, 10))[0]):
+                product_id = rng.randrange(start, end)
+                if product_id not in product_ids:
+                    product_ids.append(product_id)
+
+            age = self.until - created_at
+            if age < timedelta(days=2):
+                status = rng.choice(('pending', 'processing'))
+            else:
+                status = 'cancelled' if rng.random() < 0.08 else 'delivered'
+            delivery_date = (created_at + timedelta(days=rng.randint(0, 3))).date()
+
+            items, total = [], DELIVERY_FEE
+            for product_id in product_ids:
+                item_id += 1
+                quantity = rng.choices((1, 2, 3), weights=(85, 12, 3))[0]
+                price = self.prices[product_id]
+                total += price * quantity
+                items.append({
+                    'id': item_id,
+                    'order_id': order_id,
+                    'product_id': product_id,
+                    'quantity': quantity,
+                    'unit_price': price,
+                    'subtotal': price * quantity,
+                    'created_at': created_at,
+                })
+
+            reviews = []
+            if status == 'delivered' and rng.random() < self.args.review_rate:
+                for item in items:
+                    review_id += 1
+                    reviewed_at = datetime.combine(delivery_date, created_at.time()) + timedelta(days=rng.randint(1, 5))
+                    reviews.append({
+                        'id': review_id,
+                        'order_id': order_id,
+                        'customer_id': customer_id,
+                        'product_id': item['product_id'],
+                        'seller_id': seller_id,
+                        'rating': rng.choices((1, 2, 3, 4, 5), weights=STAR_WEIGHTS)[0],
+                        'review_text': rng.choice(REVIEW_TEXTS) if rng.random() < 0.6 else None,
+                        'created_at': reviewed_at,
+                        'updated_at': reviewed_at,
+                    })
+
+            order = {
+                'id': order_id,
+                'customer_id': customer_id,
+                'seller_id': seller_id,
+                'order_number': f'ORD-{created_at:%Y%m%d}-{order_id:06X}',
+                'total_amount': total,
+                'delivery_address': address(customer_id),
+                'delivery_date': delivery_date,
+                'delivery_time': rng.choice(('09:00-12:00', '12:00-15:00', '15:00-18:00', '18:00-21:00')),
+                'personal_message': rng.choice(MESSAGES) if rng.random() < 0.3 else None,
+                'payment_method': 'card' if rng.random() < 0.3 else 'cash_on_delivery',
+                'order_status': status,
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+            yield order, items, reviews
+
+    def write_orders(self):
+        """Заказы, позиции и отзывы пишутся пакетами заказов (в порядке внешних ключей)"""
+        totals = {'orders': 0, 'items': 0, 'reviews': 0}
+        orders, items, reviews = [], [], []
+
+        def flush():
+            self.writer.write(Order, orders)
+            self.writer.write(OrderItem, items)
+            self.writer.write(Review, reviews)
+            totals['orders'] += len(orders)
+            totals['items'] += len(items)
+            totals['reviews'] += len(reviews)
+            orders.clear()
+            items.clear()
+            reviews.clear()
+
+        started = time.perf_counter()
+        for order, order_items, order_reviews in self.orders():
+            orders.append(order)
+            items.extend(order_items)
+            reviews.extend(order_reviews)
+            if len(orders) >= self.args.batch_size:
+                flush()
+                if totals['orders'] % (self.args.batch_size * 50) == 0:
+                    rate = totals['orders'] / (time.perf_counter() - started)
+                    self.log(f"   ... {totals['orders']:,} заказов ({rate:,.0f}/с)")
+        flush()
+        return totals
+
+
+def update_aggregates():
+    """Счетчики, которые приложение ведет при создании заказов и отзывов"""
+    rebuild_rating_aggregates()
+
+    sold = db.select(
+        OrderItem.product_id.label('product_id'),
+        db.func.sum(OrderItem.quantity).label('quantity')
+    ).join(Order, Order.id == OrderItem.order_id).where(
+        Order.order_status != 'cancelled'
+    ).group_by(OrderItem.product_id).subquery()
+    db.session.execute(
+        db.update(Product).where(Product.id == sold.c.product_id).values(sold_count=sold.c.quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+    spent = db.select(
+        Order.customer_id.label('customer_id'),
+        db.func.count().label('orders'),
+        db.func.sum(Order.total_amount).label('amount')
+    ).group_by(Order.customer_id).subquery()
+    db.session.execute(
+        db.update(Customer).where(Customer.id == spent.c.customer_id)
+        .values(total_orders=spent.c.orders, total_spent=spent.c.amount)
+        .execution_options(synchronize_session=False)
+    )
+
+    sales = db.select(
+        Order.seller_id.label('seller_id'),
+        db.func.count().label('orders')
+    ).where(Order.order_status == 'delivered').group_by(Order.seller_id).subquery()
+    db.session.execute(
+        db.update(Seller).where(Seller.id == sales.c.seller_id).values(total_sales=sales.c.orders)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def reset_sequences(conn):
+    """id назначены явно - последовательности PostgreSQL нужно сдвинуть за максимум"""
+    if conn.dialect.name != 'postgresql':
+        return
+    for model in (User, Seller, Customer, Product, Order, OrderItem, Review):
+        table = model.__tablename__
+        conn.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        ))
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=SCALES, default='small', help='готовый набор размеров')
+    for name in ('sellers', 'customers', 'products', 'orders'):
+        parser.add_argument(f'--{name}', type=int, help='переопределить размер из --scale')
+    parser.add_argument('--review-rate', type=float, default=0.3, help='доля доставленных заказов с отзывами')
+    parser.add_argument('--days', type=int, default=365, help='период истории заказов')
+    parser.add_argument('--until', default='2026-01-01', help='последний день истории (YYYY-MM-DD)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--password', default='password123', help='пароль всех пользователей')
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    for name, value in SCALES[args.scale].items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+    if args.sellers < 1 or args.products < args.sellers or args.customers < 1:
+        parser.error('нужен хотя бы один продавец и покупатель, и товаров не меньше, чем продавцов')
+
+    log = lambda message: print(message, flush=True)
+
+    with app.app_context():
+        migrations.upgrade(db.engine, log=lambda message: None)
+        if db.session.query(User.id).first() is not None:
+            log('❌ БД не пуста: генератор назначает id с 1, используйте отдельную базу')
+            return 1
+
+        started = time.perf_counter()
+        with db.engine.connect() as conn:
+            generator = Generator(args, BulkWriter(conn), log)
+            log(f"🔄 Генерация ({conn.dialect.name}, {'COPY' if generator.writer.copy else 'INSERT'}), seed {args.seed}")
+
+            generator.plan_catalog()
+            for model, rows, label in (
+                (User, generator.users(), 'пользователей'),
+                (Seller, generator.sellers(), 'продавцов'),
+                (Customer, generator.customers(), 'покупателей'),
+                (Product, generator.products(), 'товаров'),
+            ):
+                log(f'✅ {generator.write_batches(model, rows):,} {label}')
+
+            totals = generator.write_orders()
+            log(f"✅ {totals['orders']:,} заказов, {totals['items']:,} позиций, {totals['reviews']:,} отзывов")
+            reset_sequences(conn)
+
+        log('🔄 Пересчет рейтингов и счетчиков...')
+        update_aggregates()
+        with db.engine.begin() as conn:
+            conn.execute(db.text('ANALYZE'))
+        log(f'✅ Готово за {time.perf_counter() - started:.0f} с')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+Настройки gunicorn для Lumme
+Файл подхватывается автоматически при запуске gunicorn из каталога backend
+"""
+
+import os
+
+# Потоковые воркеры: пока один поток считает хеш пароля (hashlib отпускает GIL),
+# остальные продолжают обслуживать каталог
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+
+def on_starting(server):
+    """Сбросить метрики предыдущего запуска (каталог общий для всех воркеров)"""
+    from config import Config
+    from metrics import reset_metrics_dir
+    reset_metrics_dir(Config.METRICS_DIR)
+
+
+def post_worker_init(worker):
+    """Начать построение поискового индекса воркера до первого поискового запроса"""
+    import sys
+    app_module = sys.modules.get('app_extended')
+    if app_module is not None:
+        app_module.sync_search_index()
+
+
+def worker_exit(server, worker):
+    """Сохранить последние метрики воркера перед выходом"""
+    import sys
+    app_module = sys.modules.get('app_extended')
+    if app_module is not None and app_module.request_metrics is not None:
+        app_module.request_metrics.flush()
@@ -0,0 +1,218 @@
+"""
+Потребление памяти воркерами Lumme
+RSS, статистика сборщика мусора, сессии SQLAlchemy и их identity map,
+размеры кэшей, крупнейшие места выделения памяти (tracemalloc) и разница
+между снимками, сделанными в разные моменты времени
+"""
+
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+
+try:
+    from sqlalchemy.orm.session import _sessions
+except ImportError:  # внутренний реестр сессий SQLAlchemy
+    _sessions = None
+
+
+def read_rss():
+    """Текущий и пиковый RSS процесса в байтах (пиковый - если текущий недоступен)"""
+    try:
+        with open('/proc/self/status') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return {
+            'rss': int(fields['VmRSS'].split()[0]) * 1024,
+            'peak': int(fields['VmHWM'].split()[0]) * 1024,
+        }
+    except (OSError, KeyError, ValueError):
+        import resource
+        return {'rss': None, 'peak': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+
+
+def session_stats():
+    """Открытые сессии SQLAlchemy и объекты в их identity map"""
+    if _sessions is None:
+        return None
+    sessions = list(_sessions.values())
+    return {
+        'count': len(sessions),
+        'identity_map': sum(len(session.identity_map) for session in sessions),
+        'new': sum(len(session.new) for session in sessions),
+    }
+
+
+def object_counts():
+    """Количество объектов, отслеживаемых GC, по типам"""
+    return Counter(type(obj).__qualname__ for obj in gc.get_objects())
+
+
+def _traces(statistics, limit):
+    return [{
+        'where': str(stat.traceback[0]) if stat.traceback else '?',
+        'size': stat.size,
+        'count': stat.count,
+        **({'size_diff': stat.size_diff, 'count_diff': stat.count_diff} if hasattr(stat, 'size_diff') else {}),
+    } for stat in statistics[:limit]]
+
+
+class MemoryInspector:
+    """
+    Память воркера.
+
+    Источники (register) - функции без аргументов, возвращающие размер
+    кэша или индекса. tracemalloc включается при старте (frames > 0) или
+    по запросу и замедляет выделение памяти, поэтому по умолчанию выключен.
+    Снимки хранятся в воркере, не больше max_snapshots, старые вытесняются.
+    """
+
+    def __init__(self, max_snapshots=10):
+        self.max_snapshots = max_snapshots
+        self._sources = {}
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+        self._logger_pid = None
+
+    def register(self, name, func):
+        self._sources[name] = func
+
+    def start_tracing(self, frames=1):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        tracemalloc.start(frames)
+
+    def stop_tracing(self):
+        tracemalloc.stop()
+
+    def sources(self):
+        result = {}
+        for name, func in self._sources.items():
+            try:
+                result[name] = func()
+            except Exception as e:
+                result[name] = f'ошибка: {e}'
+        return result
+
+    def report(self, top=20):
+        """Текущее состояние памяти воркера"""
+        report = {
+            'pid': os.getpid(),
+            'memory': read_rss(),
+            'gc': {
+                'counts': gc.get_count(),
+                'thresholds': gc.get_threshold(),
+                'generations': gc.get_stats(),
+                'garbage': len(gc.garbage),
+            },
+            'sessions': session_stats(),
+            'caches': self.sources(),
+            'tracemalloc': {'tracing': tracemalloc.is_tracing()},
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            statistics = tracemalloc.take_snapshot().statistics('lineno')
+            report['tracemalloc'].update(current=current, peak=peak, top=_traces(statistics, top))
+        return report
+
+    def capture(self, label):
+        """RSS, объекты по типам и (при включенном tracemalloc) выделения памяти"""
+        return {
+            'label': label,
+            'taken_at': time.time(),
+            'memory': read_rss(),
+            'objects': object_counts(),
+            'sessions': session_stats(),
+            'caches': self.sources(),
+            'tracemalloc': tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None,
+        }
+
+    def take_snapshot(self, label=None):
+        """Снять и запомнить снимок для последующего сравнения"""
+        snapshot = self.capture(label or time.strftime('%Y%m%d-%H%M%S'))
+        with self._lock:
+            self._snapshots.pop(snapshot['label'], None)
+            self._snapshots[snapshot['label']] = snapshot
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def snapshots(self):
+        with self._lock:
+            return [{
+                'label': snapshot['label'],
+                'taken_at': snapshot['taken_at'],
+                'rss': snapshot['memory']['rss'],
+                'tracemalloc': snapshot['tracemalloc'] is not None,
+            } for snapshot in self._snapshots.values()]
+
+    def get_snapshot(self, label):
+        with self._lock:
+            return self._snapshots.get(label)
+
+    def diff(self, old, new, top=20):
+        """Что выросло между снимками old и new: RSS, объекты по типам, места выделения"""
+        growth = Counter(new['objects'])
+        growth.subtract(old['objects'])
+        result = {
+            'from': old['label'],
+            'to': new['label'],
+            'seconds': round(new['taken_at'] - old['taken_at'], 1),
+            'rss_diff': None if new['memory']['rss'] is None else new['memory']['rss'] - old['memory']['rss'],
+            'objects_diff': [
+                {'type': name, 'count': new['objects'][name], 'count_diff': diff}
+                for name, diff in growth.most_common(top) if diff > 0
+            ],
+            'sessions': {'from': old['sessions'], 'to': new['sessions']},
+            'caches': {'from': old['caches'], 'to': new['caches']},
+            'tracemalloc': None,
+        }
+        if old['tracemalloc'] is not None and new['tracemalloc'] is not None:
+            statistics = new['tracemalloc'].compare_to(old['tracemalloc'], 'lineno')
+            result['tracemalloc'] = _traces(statistics, top)
+        return result
+
+    def start_logger(self, logger, interval, top=5):
+        """
+        Периодически писать в лог RSS, сессии, кэши и рост с прошлой записи.
+
+        Вызывается при каждом запросе: поток создается один раз в процессе
+        воркера (после fork gunicorn потоки не наследуются).
+        """
+        if self._logger_pid == os.getpid():
+            return
+        self._logger_pid = os.getpid()
+        thread = threading.Thread(
+            target=self._log_loop, args=(logger, interval, top), name='memory-logger', daemon=True
+        )
+        thread.start()
+
+    def _log_loop(self, logger, interval, top):
+        previous = None
+        while True:
+            time.sleep(interval)
+            try:
+                current = self.capture(time.strftime('%Y%m%d-%H%M%S'))
+                message = (
+                    f"RSS {_megabytes(current['memory']['rss'])}, пик {_megabytes(current['memory']['peak'])}, "
+                    f"сессии {current['sessions']}, кэши {current['caches']}, GC {gc.get_count()}"
+                )
+                if previous is not None:
+                    diff = self.diff(previous, current, top=top)
+                    growth = ', '.join(f"{item['type']} +{item['count_diff']}" for item in diff['objects_diff'])
+                    message += f"; за {diff['seconds']} с: RSS {_megabytes(diff['rss_diff'], sign=True)}, объекты: {growth or 'без роста'}"
+                    if diff['tracemalloc']:
+                        message += '; выделения: ' + ', '.join(
+                            f"{item['where']} {item['size_diff']:+d} Б" for item in diff['tracemalloc']
+                        )
+                logger.warning('Память воркера %s: %s', os.getpid(), message)
+                previous = current
+            except Exception as e:
+                logger.warning('Не удалось снять состояние памяти: %s', e)
+
+
+def _megabytes(value, sign=False):
+    if value is None:
+        return '?'
+    return f'{value / 1048576:{"+" if sign else ""}.1f} МБ'
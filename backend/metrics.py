@@ -0,0 +1,299 @@
+"""
+Метрики Lumme в формате Prometheus
+Задержки, статусы и SQL-запросы по маршрутам, запросы в обработке и ожидание
+соединения в пуле. Каждый воркер gunicorn периодически сохраняет свои
+значения в файл общего каталога; /api/metrics суммирует файлы всех воркеров
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import g, request
+from sqlalchemy import exc as sqlalchemy_exc
+
+from query_stats import get_query_stats
+
+try:
+    import fcntl
+except ImportError:  # Windows: объединение файлов завершившихся воркеров не сериализуется
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# Имя -> (тип, описание, границы гистограммы)
+METRICS = {
+    'lumme_http_requests_total': ('counter', 'HTTP-запросы по маршруту и статусу', None),
+    'lumme_http_request_duration_seconds': ('histogram', 'Время обработки HTTP-запроса', LATENCY_BUCKETS),
+    'lumme_http_requests_in_flight': ('gauge', 'HTTP-запросы в обработке', None),
+    'lumme_db_queries_per_request': ('histogram', 'SQL-запросов на HTTP-запрос', QUERY_COUNT_BUCKETS),
+    'lumme_db_request_duration_seconds': ('histogram', 'Время в БД на HTTP-запрос', LATENCY_BUCKETS),
+    'lumme_db_pool_wait_seconds': ('histogram', 'Ожидание соединения из пула SQLAlchemy (с открытием нового)', POOL_WAIT_BUCKETS),
+    'lumme_db_pool_checked_out': ('gauge', 'Соединения, выданные из пула', None),
+    'lumme_db_pool_checked_in': ('gauge', 'Свободные соединения в пуле', None),
+    'lumme_db_pool_size': ('gauge', 'Постоянный размер пула (pool_size)', None),
+    'lumme_db_pool_overflow': ('gauge', 'Соединения сверх pool_size (отрицательное - не открытые)', None),
+    'lumme_db_pool_timeouts_total': ('counter', 'Запросы, не дождавшиеся соединения из пула', None),
+}
+
+# Файл с суммой значений завершившихся воркеров
+_RETIRED = 'retired.json'
+
+
+def reset_metrics_dir(directory):
+    """Удалить файлы предыдущего запуска (вызывается мастером gunicorn при старте)"""
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metrics:
+    """
+    Метрики воркера.
+
+    Счетчики и гистограммы накапливаются в памяти и не чаще раза в
+    flush_interval секунд записываются в <directory>/<pid>.json; значения
+    других воркеров в /api/metrics отстают не больше чем на этот интервал.
+    Счетчики завершившихся воркеров переносятся в общий файл, чтобы суммы
+    не уменьшались; их gauge-значения отбрасываются.
+    """
+
+    def __init__(self, directory, flush_interval=5.0, timer=time.monotonic):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.timer = timer
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._gauge_callbacks = []
+        self._lock = threading.Lock()
+        self._flushed_at = None
+        os.makedirs(directory, exist_ok=True)
+
+    def inc(self, name, labels='', value=1):
+        with self._lock:
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add(self, name, labels='', value=1):
+        """Изменить gauge воркера на value (например, запросы в обработке)"""
+        with self._lock:
+            key = (name, labels)
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def gauge_callback(self, name, func, labels=''):
+        """Gauge, значение которого вычисляется при сохранении (например, занятость пула)"""
+        self._gauge_callbacks.append((name, labels, func))
+
+    def observe(self, name, value, labels=''):
+        buckets = METRICS[name][2]
+        with self._lock:
+            key = (name, labels)
+            state = self._histograms.get(key)
+            if state is None:
+                # Счетчики по границам (не накопительные), затем сумма и количество
+                state = self._histograms[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def maybe_flush(self):
+        if self._flushed_at is None or self.timer() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Записать значения воркера атомарно (tmp-файл и os.replace)"""
+        self._flushed_at = self.timer()
+        gauges = [(name, labels, func()) for name, labels, func in self._gauge_callbacks]
+        with self._lock:
+            state = {
+                'counters': [[name, labels, value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, labels, values] for (name, labels), values in self._histograms.items()],
+                'gauges': [[name, labels, value] for (name, labels), value in self._gauges.items()] +
+                          [list(gauge) for gauge in gauges],
+            }
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Сумма значений всех воркеров: (счетчики, гистограммы, gauge)"""
+        self.flush()
+        self._retire_dead_workers()
+
+        counters, histograms, gauges = {}, {}, {}
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            state = _read(path)
+            if state is None:
+                continue
+            _merge(counters, histograms, state)
+            for name, labels, value in state.get('gauges', ()):
+                gauges[(name, labels)] = gauges.get((name, labels), 0) + value
+        return counters, histograms, gauges
+
+    def render(self):
+        """Текстовый формат Prometheus 0.0.4"""
+        counters, histograms, gauges = self.collect()
+        values = {'counter': counters, 'gauge': gauges}
+        lines = []
+        for name, (kind, description, buckets) in METRICS.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'histogram':
+                for (metric, labels), state in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    prefix = f'{labels},' if labels else ''
+                    cumulative = 0
+                    for bound, count in zip(buckets, state):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {state[-1]}')
+                    lines.append(f'{name}_sum{_braces(labels)} {state[-2]}')
+                    lines.append(f'{name}_count{_braces(labels)} {state[-1]}')
+            else:
+                for (metric, labels), value in sorted(values[kind].items()):
+                    if metric == name:
+                        lines.append(f'{name}{_braces(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _retire_dead_workers(self):
+        """Перенести счетчики и гистограммы завершившихся воркеров в общий файл"""
+        dead = []
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            name = os.path.basename(path)[:-len('.json')]
+            if name.isdigit() and not _alive(int(name)):
+                dead.append(path)
+        if not dead:
+            return
+
+        with open(os.path.join(self.directory, 'retired.lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            retired_path = os.path.join(self.directory, _RETIRED)
+            counters, histograms = {}, {}
+            _merge(counters, histograms, _read(retired_path) or {})
+            dead = [path for path in dead if os.path.exists(path)]  # другой воркер мог успеть раньше
+            for path in dead:
+                _merge(counters, histograms, _read(path) or {})
+
+            tmp_path = f'{retired_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+                    'histograms': [[name, labels, values] for (name, labels), values in histograms.items()],
+                }, f)
+            os.replace(tmp_path, retired_path)
+            for path in dead:
+                os.remove(path)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(counters, histograms, state):
+    for name, labels, value in state.get('counters', ()):
+        counters[(name, labels)] = counters.get((name, labels), 0) + value
+    for name, labels, values in state.get('histograms', ()):
+        current = histograms.get((name, labels))
+        histograms[(name, labels)] = values if current is None else [a + b for a, b in zip(current, values)]
+
+
+def _braces(labels):
+    return f'{{{labels}}}' if labels else ''
+
+
+def instrument_pool(engine, metrics):
+    """
+    Время ожидания соединения из пула, отказы по DB_POOL_TIMEOUT и заполнение пула.
+
+    Ждет пул в _do_get (когда все соединения заняты), поэтому измеряется он.
+    Пул, пересозданный engine.dispose(), не измеряется.
+    """
+    pool = engine.pool
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        except sqlalchemy_exc.TimeoutError:
+            metrics.inc('lumme_db_pool_timeouts_total')
+            raise
+        finally:
+            metrics.observe('lumme_db_pool_wait_seconds', time.perf_counter() - started)
+
+    pool._do_get = timed_do_get
+    # QueuePool; у других пулов (SQLite в памяти) части счетчиков нет
+    for name, method in (
+        ('lumme_db_pool_checked_out', 'checkedout'),
+        ('lumme_db_pool_checked_in', 'checkedin'),
+        ('lumme_db_pool_size', 'size'),
+        ('lumme_db_pool_overflow', 'overflow'),
+    ):
+        if hasattr(pool, method):
+            metrics.gauge_callback(name, getattr(pool, method))
+
+
+def init_metrics(app, metrics):
+    """Подключить сбор метрик запросов к приложению"""
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        metrics.add('lumme_http_requests_in_flight', value=1)
+
+    @app.after_request
+    def remember_response_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request_metrics(exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        metrics.add('lumme_http_requests_in_flight', value=-1)
+
+        # Шаблон маршрута, а не путь: число рядов метрик не растет с числом товаров
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = _labels(method=request.method, route=route)
+        stats = get_query_stats()
+        metrics.inc('lumme_http_requests_total', _labels(
+            method=request.method, route=route, status=g.pop('metrics_status', 500)
+        ))
+        metrics.observe('lumme_http_request_duration_seconds', time.perf_counter() - started, labels)
+        metrics.observe('lumme_db_queries_per_request', stats['count'], labels)
+        metrics.observe('lumme_db_request_duration_seconds', stats['time'], labels)
+        metrics.maybe_flush()
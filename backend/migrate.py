@@ -0,0 +1,48 @@
+"""
+Управление миграциями схемы БД Lumme
+
+    python migrate.py upgrade   - применить непримененные миграции
+    python migrate.py status    - список миграций (код 1, если есть непримененные)
+    python migrate.py check     - проверить, что модели покрыты миграциями (код 1, если нет)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ['INIT_DB_ON_STARTUP'] = 'false'
+os.environ['SLOW_QUERY_MS'] = '0'
+
+import migrations
+from app_extended import app, db
+
+
+def main(command):
+    if command == 'check':
+        problems = migrations.check(db.metadata)
+        for problem in problems:
+            print(f"❌ Нет миграции: {problem}")
+        if problems:
+            return 1
+        print("✅ Модели полностью покрыты миграциями")
+        return 0
+
+    with app.app_context():
+        if command == 'upgrade':
+            applied = migrations.upgrade(db.engine)
+            print(f"✅ Схема актуальна (применено миграций: {len(applied)})")
+            return 0
+
+        if command == 'status':
+            waiting = {version for version, _ in migrations.pending(db.engine)}
+            for version, name in migrations.discover():
+                mark = '⏳' if version in waiting else '✅'
+                print(f"{mark} {name}")
+            return 1 if waiting else 0
+
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1] if len(sys.argv) > 1 else ''))
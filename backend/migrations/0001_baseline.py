@@ -0,0 +1,127 @@
+"""
+Базовая схема Lumme (таблицы, создававшиеся db.create_all())
+
+Таблицы описаны здесь отдельно от моделей, чтобы миграция не менялась
+вместе с ними. На существующей БД создаются только отсутствующие таблицы.
+"""
+
+import sqlalchemy as sa
+
+
+def upgrade(conn):
+    metadata = sa.MetaData()
+    now = sa.func.now()
+
+    sa.Table(
+        'users', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('email', sa.String(255), unique=True, nullable=False),
+        sa.Column('password_hash', sa.String(255), nullable=False),
+        sa.Column('first_name', sa.String(100)),
+        sa.Column('last_name', sa.String(100)),
+        sa.Column('phone', sa.String(20)),
+        sa.Column('user_type', sa.String(20)),
+        sa.Column('telegram_id', sa.BigInteger, unique=True),
+        sa.Column('is_active', sa.Boolean),
+        sa.Column('created_at', sa.DateTime, server_default=now),
+        sa.Column('updated_at', sa.DateTime, server_default=now)
+    )
+
+    sa.Table(
+        'sellers', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), unique=True, nullable=False),
+        sa.Column('shop_name', sa.String(255), nullable=False),
+        sa.Column('shop_description', sa.Text),
+        sa.Column('shop_address', sa.String(255)),
+        sa.Column('shop_phone', sa.String(20)),
+        sa.Column('rating', sa.Float),
+        sa.Column('total_sales', sa.Integer),
+        sa.Column('is_verified', sa.Boolean),
+        sa.Column('created_at', sa.DateTime, server_default=now),
+        sa.Column('updated_at', sa.DateTime, server_default=now)
+    )
+
+    sa.Table(
+        'customers', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), unique=True, nullable=False),
+        sa.Column('default_address', sa.String(255)),
+        sa.Column('delivery_addresses', sa.JSON),
+        sa.Column('total_orders', sa.Integer),
+        sa.Column('total_spent', sa.Float),
+        sa.Column('created_at', sa.DateTime, server_default=now),
+        sa.Column('updated_at', sa.DateTime, server_default=now)
+    )
+
+    sa.Table(
+        'products', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('seller_id', sa.Integer, sa.ForeignKey('sellers.id'), nullable=False),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('description', sa.Text),
+        sa.Column('price', sa.Float, nullable=False),
+        sa.Column('composition', sa.JSON),
+        sa.Column('occasion', sa.String(100)),
+        sa.Column('size', sa.String(20)),
+        sa.Column('stock_quantity', sa.Integer),
+        sa.Column('is_in_stock', sa.Boolean),
+        sa.Column('rating', sa.Float),
+        sa.Column('review_count', sa.Integer),
+        sa.Column('image_url', sa.String(500)),
+        sa.Column('created_at', sa.DateTime, server_default=now),
+        sa.Column('updated_at', sa.DateTime, server_default=now)
+    )
+
+    sa.Table(
+        'orders', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('customer_id', sa.Integer, sa.ForeignKey('customers.id'), nullable=False),
+        sa.Column('seller_id', sa.Integer, sa.ForeignKey('sellers.id'), nullable=False),
+        sa.Column('order_number', sa.String(50), unique=True, nullable=False),
+        sa.Column('total_amount', sa.Float, nullable=False),
+        sa.Column('delivery_address', sa.String(255), nullable=False),
+        sa.Column('delivery_date', sa.Date, nullable=False),
+        sa.Column('delivery_time', sa.String(20)),
+        sa.Column('personal_message', sa.Text),
+        sa.Column('payment_method', sa.String(50)),
+        sa.Column('order_status', sa.String(50)),
+        sa.Column('created_at', sa.DateTime, server_default=now),
+        sa.Column('updated_at', sa.DateTime, server_default=now)
+    )
+
+    sa.Table(
+        'order_items', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('order_id', sa.Integer, sa.ForeignKey('orders.id'), nullable=False),
+        sa.Column('product_id', sa.Integer, sa.ForeignKey('products.id'), nullable=False),
+        sa.Column('quantity', sa.Integer),
+        sa.Column('unit_price', sa.Float, nullable=False),
+        sa.Column('subtotal', sa.Float, nullable=False),
+        sa.Column('created_at', sa.DateTime, server_default=now)
+    )
+
+    sa.Table(
+        'reviews', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('order_id', sa.Integer, sa.ForeignKey('orders.id'), nullable=False),
+        sa.Column('customer_id', sa.Integer, sa.ForeignKey('customers.id'), nullable=False),
+        sa.Column('product_id', sa.Integer, sa.ForeignKey('products.id'), nullable=False),
+        sa.Column('seller_id', sa.Integer, sa.ForeignKey('sellers.id'), nullable=False),
+        sa.Column('rating', sa.Integer, nullable=False),
+        sa.Column('review_text', sa.Text),
+        sa.Column('created_at', sa.DateTime, server_default=now),
+        sa.Column('updated_at', sa.DateTime, server_default=now)
+    )
+
+    sa.Table(
+        'cart', metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('customer_id', sa.Integer, sa.ForeignKey('customers.id'), nullable=False),
+        sa.Column('product_id', sa.Integer, sa.ForeignKey('products.id'), nullable=False),
+        sa.Column('quantity', sa.Integer),
+        sa.Column('added_at', sa.DateTime, server_default=now),
+        sa.UniqueConstraint('customer_id', 'product_id', name='unique_cart_item')
+    )
+
+    metadata.create_all(conn, checkfirst=True)
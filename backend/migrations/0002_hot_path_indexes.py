@@ -0,0 +1,26 @@
+"""
+Индексы для горячих запросов API
+
+- get_products: фильтр is_in_stock/occasion/size/price и сортировки
+  по (price, id) и (created_at, id) для курсорной пагинации;
+- get_orders: заказы покупателя и продавца, новые первыми;
+- get_product_reviews: отзывы товара, новые первыми.
+
+cart.customer_id и sellers.user_id уже покрыты уникальными ограничениями
+unique_cart_item (customer_id, product_id) и sellers.user_id.
+"""
+
+from migrations import create_index
+
+
+def upgrade(conn):
+    create_index(conn, 'ix_products_catalog', 'products', 'is_in_stock', 'occasion', 'size', 'price')
+    create_index(conn, 'ix_products_stock_price', 'products', 'is_in_stock', 'price', 'id')
+    create_index(conn, 'ix_products_stock_created', 'products', 'is_in_stock', 'created_at', 'id')
+    create_index(conn, 'ix_products_seller_id', 'products', 'seller_id')
+
+    create_index(conn, 'ix_orders_customer_created', 'orders', 'customer_id', 'created_at', 'id')
+    create_index(conn, 'ix_orders_seller_created', 'orders', 'seller_id', 'created_at', 'id')
+    create_index(conn, 'ix_order_items_order_id', 'order_items', 'order_id')
+
+    create_index(conn, 'ix_reviews_product_created', 'reviews', 'product_id', 'created_at', 'id')
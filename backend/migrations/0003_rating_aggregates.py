@@ -0,0 +1,48 @@
+"""
+Агрегаты рейтингов товаров и продавцов
+
+Сумма оценок, количество отзывов и гистограмма по звездам хранятся
+в products и sellers и обновляются при каждом новом отзыве. Для уже
+существующих отзывов агрегаты заполняются одним групповым запросом.
+"""
+
+import sqlalchemy as sa
+
+from migrations import add_column
+
+STARS = range(1, 6)
+
+
+def _counter(name):
+    return sa.Column(name, sa.Integer, nullable=False, server_default='0')
+
+
+def _backfill(conn, table, owner_column, source):
+    stars = ', '.join(f'SUM(CASE WHEN r.rating = {n} THEN 1 ELSE 0 END) AS stars_{n}' for n in STARS)
+    assign = ', '.join(f'stars_{n} = agg.stars_{n}' for n in STARS)
+    conn.execute(sa.text(f"""
+        UPDATE {table}
+        SET rating_sum = agg.total,
+            review_count = agg.cnt,
+            rating = CAST(agg.total AS FLOAT) / agg.cnt,
+            {assign}
+        FROM (
+            SELECT {owner_column} AS owner_id, COUNT(*) AS cnt, SUM(r.rating) AS total, {stars}
+            FROM {source}
+            GROUP BY {owner_column}
+        ) AS agg
+        WHERE {table}.id = agg.owner_id
+    """))
+
+
+def upgrade(conn):
+    for table in ('products', 'sellers'):
+        add_column(conn, table, _counter('rating_sum'))
+        for n in STARS:
+            add_column(conn, table, _counter(f'stars_{n}'))
+    add_column(conn, 'sellers', _counter('review_count'))
+
+    conn.execute(sa.text('UPDATE products SET review_count = 0 WHERE review_count IS NULL'))
+
+    _backfill(conn, 'products', 'r.product_id', 'reviews r')
+    _backfill(conn, 'sellers', 'p.seller_id', 'reviews r JOIN products p ON p.id = r.product_id')
@@ -0,0 +1,13 @@
+"""
+Индексы истории заказов продавца
+
+- фильтр по статусу с сортировкой по дате создания и сводка по статусам;
+- фильтр и сортировка по дате доставки.
+"""
+
+from migrations import create_index
+
+
+def upgrade(conn):
+    create_index(conn, 'ix_orders_seller_status_created', 'orders', 'seller_id', 'order_status', 'created_at', 'id')
+    create_index(conn, 'ix_orders_seller_delivery', 'orders', 'seller_id', 'delivery_date', 'id')
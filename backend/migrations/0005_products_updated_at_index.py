@@ -0,0 +1,12 @@
+"""
+Индекс по времени изменения товаров
+
+Поисковый индекс воркера периодически выбирает товары, измененные
+после последней синхронизации, без полного просмотра таблицы.
+"""
+
+from migrations import create_index
+
+
+def upgrade(conn):
+    create_index(conn, 'ix_products_updated_at', 'products', 'updated_at')
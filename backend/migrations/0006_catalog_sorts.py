@@ -0,0 +1,35 @@
+"""
+Сортировки каталога: популярность и индексы для всех режимов
+
+- products.sold_count - продано штук, заполняется по уже оформленным заказам;
+- индексы (is_in_stock, ключ, id) для сортировок по рейтингу и популярности;
+- в SQLite даты сравниваются через julianday(), поэтому для "новинок"
+  нужен индекс по выражению.
+"""
+
+import sqlalchemy as sa
+
+from migrations import add_column, create_index
+
+
+def upgrade(conn):
+    add_column(conn, 'products', sa.Column('sold_count', sa.Integer, nullable=False, server_default='0'))
+    conn.execute(sa.text("""
+        UPDATE products
+        SET sold_count = agg.sold
+        FROM (
+            SELECT product_id, SUM(quantity) AS sold
+            FROM order_items
+            GROUP BY product_id
+        ) AS agg
+        WHERE products.id = agg.product_id
+    """))
+
+    create_index(conn, 'ix_products_stock_rating', 'products', 'is_in_stock', 'rating', 'id')
+    create_index(conn, 'ix_products_stock_sold', 'products', 'is_in_stock', 'sold_count', 'id')
+
+    if conn.dialect.name == 'sqlite':
+        conn.execute(sa.text(
+            'CREATE INDEX IF NOT EXISTS ix_products_stock_created_jd '
+            'ON products (is_in_stock, julianday(created_at), id)'
+        ))
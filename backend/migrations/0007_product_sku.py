@@ -0,0 +1,15 @@
+"""
+Артикул товара продавца
+
+products.sku - необязательный артикул; пара (seller_id, sku) уникальна
+и служит ключом upsert при массовом импорте товаров.
+"""
+
+import sqlalchemy as sa
+
+from migrations import add_column, create_index
+
+
+def upgrade(conn):
+    add_column(conn, 'products', sa.Column('sku', sa.String(64)))
+    create_index(conn, 'ix_products_seller_sku', 'products', 'seller_id', 'sku', unique=True)
@@ -0,0 +1,153 @@
+"""
+Миграции схемы БД Lumme
+
+Каждая миграция - файл NNNN_описание.py с функцией upgrade(conn).
+Примененные версии хранятся в таблице schema_migrations; каждая миграция
+выполняется в отдельной транзакции. Применение: python migrate.py upgrade
+"""
+
+import contextlib
+import importlib
+import os
+import re
+import warnings
+
+import sqlalchemy as sa
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+VERSION_TABLE = 'schema_migrations'
+
+# Ключ advisory-блокировки PostgreSQL: воркеры не применяют миграции одновременно
+ADVISORY_LOCK_ID = 742001
+
+_FILENAME = re.compile(r'^(\d{4})_\w+\.py$')
+
+_metadata = sa.MetaData()
+_versions = sa.Table(
+    VERSION_TABLE, _metadata,
+    sa.Column('version', sa.String(16), primary_key=True),
+    sa.Column('name', sa.String(255), nullable=False),
+    sa.Column('applied_at', sa.DateTime, server_default=sa.func.now())
+)
+
+
+def discover():
+    """Список миграций [(версия, имя модуля)] в порядке применения"""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append((match.group(1), filename[:-3]))
+    return migrations
+
+
+def applied_versions(conn):
+    """Версии, уже примененные к БД"""
+    if not sa.inspect(conn).has_table(VERSION_TABLE):
+        return set()
+    return {row.version for row in conn.execute(sa.select(_versions.c.version))}
+
+
+def pending(engine):
+    """Миграции, еще не примененные к БД"""
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+    return [(version, name) for version, name in discover() if version not in done]
+
+
+def upgrade(engine, log=print):
+    """Применить все непримененные миграции; возвращает список примененных версий"""
+    applied = []
+    for version, name in discover():
+        with engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                # Ожидание блокировки и создание индексов не ограничиваются statement_timeout
+                conn.execute(sa.text('SET LOCAL statement_timeout = 0'))
+                conn.execute(sa.text('SELECT pg_advisory_xact_lock(:id)'), {'id': ADVISORY_LOCK_ID})
+
+            _metadata.create_all(conn, checkfirst=True)
+            if version in applied_versions(conn):
+                continue
+
+            module = importlib.import_module(f'{__name__}.{name}')
+            module.upgrade(conn)
+            conn.execute(_versions.insert().values(version=version, name=name))
+
+        applied.append(version)
+        log(f"✅ Миграция {name} применена")
+    return applied
+
+
+@contextlib.contextmanager
+def _quiet_reflection():
+    with warnings.catch_warnings():
+        # Индексы по выражениям (julianday() в SQLite) SQLAlchemy не отражает
+        warnings.filterwarnings('ignore', 'Skipped unsupported reflection', sa.exc.SAWarning)
+        yield
+
+
+def _index_names(inspector, table):
+    with _quiet_reflection():
+        return {ix['name'] for ix in inspector.get_indexes(table)}
+
+
+def create_index(conn, name, table, *columns, unique=False):
+    """Создать индекс, если его еще нет (для использования в миграциях)"""
+    if name in _index_names(sa.inspect(conn), table):
+        return
+
+    with _quiet_reflection():
+        reflected = sa.Table(table, sa.MetaData(), autoload_with=conn)
+    sa.Index(name, *[reflected.c[col] for col in columns], unique=unique).create(conn)
+
+
+def add_column(conn, table, column):
+    """Добавить столбец (sa.Column), если его еще нет (для использования в миграциях)"""
+    inspector = sa.inspect(conn)
+    if column.name in {col['name'] for col in inspector.get_columns(table)}:
+        return
+
+    spec = sa.schema.CreateColumn(column).compile(dialect=conn.dialect)
+    conn.execute(sa.text(f'ALTER TABLE {table} ADD COLUMN {spec}'))
+
+
+def diff(metadata, engine):
+    """Таблицы, столбцы и индексы моделей, которых нет в БД"""
+    inspector = sa.inspect(engine)
+    tables = set(inspector.get_table_names())
+    problems = []
+
+    for table in metadata.sorted_tables:
+        if table.name not in tables:
+            problems.append(f"таблица {table.name}")
+            continue
+
+        columns = {col['name'] for col in inspector.get_columns(table.name)}
+        problems.extend(
+            f"столбец {table.name}.{col.name}" for col in table.columns if col.name not in columns
+        )
+
+        indexes = _index_names(inspector, table.name)
+        problems.extend(
+            f"индекс {table.name}.{ix.name}" for ix in table.indexes if ix.name not in indexes
+        )
+
+    return problems
+
+
+def check(metadata):
+    """
+    Применить все миграции к пустой SQLite БД в памяти и сравнить с моделями.
+
+    Непустой результат означает, что изменение моделей не покрыто миграцией.
+    """
+    versions = [version for version, _ in discover()]
+    problems = [f"дублируется версия {v}" for v in sorted(set(versions)) if versions.count(v) > 1]
+
+    engine = sa.create_engine('sqlite://')
+    try:
+        upgrade(engine, log=lambda message: None)
+        problems.extend(diff(metadata, engine))
+    finally:
+        engine.dispose()
+    return problems
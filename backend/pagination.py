@@ -0,0 +1,90 @@
+"""
+Курсорная (keyset) пагинация Lumme
+Страницы выбираются по условию (col1, col2) > (v1, v2) вместо OFFSET,
+поэтому глубокие страницы стоят столько же, сколько первая
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import DateTime, func, tuple_
+
+
+class CursorError(ValueError):
+    """Некорректный или чужой курсор"""
+
+
+def clamp_per_page(per_page, max_per_page):
+    """Ограничить размер страницы диапазоном 1..max_per_page"""
+    return max(1, min(per_page, max_per_page))
+
+
+def _to_json(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _from_json(column, value):
+    python_type = column.type.python_type
+    if python_type in (date, datetime):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def _sort_expression(column, value, dialect):
+    """
+    В SQLite даты хранятся строками: server_default пишет их без микросекунд,
+    а параметры - с микросекундами, поэтому сравниваем через julianday()
+    """
+    if dialect == 'sqlite' and isinstance(column.type, DateTime):
+        return func.julianday(column), func.julianday(value)
+    return column, value
+
+
+def encode_cursor(sort, values):
+    """Закодировать значения ключа сортировки последней строки в курсор"""
+    payload = json.dumps({'s': sort, 'v': [_to_json(v) for v in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort, columns):
+    """Раскодировать курсор; курсор должен относиться к той же сортировке"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload['s'] != sort or len(payload['v']) != len(columns):
+            raise CursorError('Курсор не соответствует сортировке')
+        return [_from_json(col, v) for col, v in zip(columns, payload['v'])]
+    except CursorError:
+        raise
+    except (ValueError, KeyError, TypeError) as e:
+        raise CursorError('Некорректный курсор') from e
+
+
+def keyset_paginate(query, columns, per_page, cursor=None, sort='', descending=False):
+    """
+    Выбрать страницу после курсора.
+
+    columns - ключ сортировки, последний столбец должен быть уникальным (id).
+    Возвращает (items, next_cursor); next_cursor равен None на последней странице.
+    """
+    dialect = query.session.get_bind().dialect.name
+    values = decode_cursor(cursor, sort, columns) if cursor else [None] * len(columns)
+    pairs = [_sort_expression(col, value, dialect) for col, value in zip(columns, values)]
+    keys = [key for key, _ in pairs]
+
+    if cursor:
+        key, bound = tuple_(*keys), tuple_(*[value for _, value in pairs])
+        query = query.filter(key < bound if descending else key > bound)
+
+    order = [key.desc() if descending else key.asc() for key in keys]
+    rows = query.order_by(*order).limit(per_page + 1).all()
+
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor(sort, [getattr(last, col.key) for col in columns])
+    return items, next_cursor
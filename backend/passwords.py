@@ -0,0 +1,70 @@
+"""
+Хеширование паролей Lumme
+Настраиваемый алгоритм и стоимость, перехеширование при входе
+и выполнение в ограниченном пуле потоков или процессов
+"""
+
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Очередь хеширования переполнена - запрос нужно повторить позже"""
+
+
+class PasswordHasher:
+    """
+    Хеширование паролей по политике method (формат werkzeug, например
+    'scrypt:32768:8:1' или 'pbkdf2:sha256:600000').
+
+    При workers=0 хеш считается в текущем потоке. Иначе - в пуле из workers
+    потоков или процессов; одновременно ожидают не больше max_pending задач,
+    остальные получают HasherBusy через timeout секунд.
+    """
+
+    def __init__(self, method='scrypt', workers=0, pool='thread', max_pending=None, timeout=2.0):
+        self.method = method
+        self.workers = workers
+        self.pool = pool
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending or max(workers, 1) * 4)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._prefix = None
+
+    def _get_executor(self):
+        # Пул создается лениво, уже внутри воркера gunicorn (после fork)
+        with self._executor_lock:
+            if self._executor is None:
+                executor_class = ProcessPoolExecutor if self.pool == 'process' else ThreadPoolExecutor
+                self._executor = executor_class(max_workers=self.workers)
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy('Слишком много одновременных запросов на вход')
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Хеш создан по другой политике (алгоритм или стоимость)"""
+        if self._prefix is None:
+            # 'scrypt' разворачивается werkzeug в 'scrypt:32768:8:1' и т.п.
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
@@ -0,0 +1,227 @@
+"""
+Массовый импорт и экспорт товаров Lumme
+Потоковое чтение CSV/NDJSON, проверка строк и запись в тех же форматах
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+
+FORMATS = ('csv', 'ndjson')
+
+# Поля файла импорта/экспорта в порядке столбцов CSV
+FIELDS = ('id', 'sku', 'name', 'description', 'price', 'composition', 'occasion', 'size', 'stock_quantity', 'image_url')
+
+SIZES = ('small', 'medium', 'large')
+
+_MAX_LENGTH = {'sku': 64, 'name': 255, 'occasion': 100, 'image_url': 500}
+
+
+class ImportFormatError(ValueError):
+    """Файл нельзя разобрать целиком (неизвестный формат, нет заголовка CSV)"""
+
+
+class ImportStreamError(ImportFormatError):
+    """Поток нельзя дочитать со строки line (кодировка, синтаксис CSV); прочитанные строки уже выданы"""
+
+    def __init__(self, line, message):
+        super().__init__(message)
+        self.line = line
+
+
+def detect_format(explicit, content_type):
+    """Формат из ?format= или Content-Type"""
+    if explicit:
+        if explicit not in FORMATS:
+            raise ImportFormatError(f'Неизвестный формат: {explicit}')
+        return explicit
+    content_type = (content_type or '').lower()
+    if 'csv' in content_type:
+        return 'csv'
+    if 'ndjson' in content_type or 'jsonl' in content_type or 'json' in content_type:
+        return 'ndjson'
+    raise ImportFormatError('Укажите формат: ?format=csv|ndjson или Content-Type text/csv / application/x-ndjson')
+
+
+def _lines(stream):
+    """Байтовые строки потока с номерами (буферизованно: request.stream читается без буфера)"""
+    if isinstance(stream, io.RawIOBase):
+        stream = io.BufferedReader(stream)
+    return enumerate(stream, 1)
+
+
+def _decode(line_num, raw):
+    """Строка в UTF-8 (BOM в начале файла пропускается)"""
+    try:
+        return raw.decode('utf-8-sig' if line_num == 1 else 'utf-8')
+    except UnicodeDecodeError as e:
+        raise ImportStreamError(line_num, f'Некорректная кодировка UTF-8 (байт {e.start + 1})') from e
+
+
+def read_rows(stream, fmt):
+    """
+    Построчно читать байтовый поток; выдает (номер строки, dict или None, ошибка).
+    Файл целиком в память не загружается. Ошибка строки NDJSON (JSON, кодировка)
+    относится только к ней; CSV с ошибкой кодировки или синтаксиса дальше не
+    читается (поле в кавычках может занимать несколько строк): ImportStreamError
+    после всех прочитанных до нее строк.
+    """
+    if fmt == 'csv':
+        last_line = 0
+
+        def decoded():
+            nonlocal last_line
+            for last_line, raw in _lines(stream):
+                yield _decode(last_line, raw)
+
+        reader = csv.DictReader(decoded())
+        try:
+            if reader.fieldnames is None:
+                return
+            unknown = set(reader.fieldnames) - set(FIELDS)
+            if unknown:
+                raise ImportFormatError(f"Неизвестные столбцы: {', '.join(sorted(unknown))}")
+            for row in reader:
+                yield reader.line_num, row, None
+        except csv.Error as e:
+            # reader.line_num на ошибке еще не учитывает строку, которую разбирал
+            raise ImportStreamError(last_line, f'Некорректный CSV: {e}') from e
+        return
+
+    for line_num, raw in _lines(stream):
+        try:
+            line = _decode(line_num, raw)
+        except ImportStreamError as e:
+            yield line_num, None, {'_': str(e)}
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_num, None, {'_': f'Некорректный JSON: {e}'}
+            continue
+        if not isinstance(row, dict):
+            yield line_num, None, {'_': 'Строка должна быть JSON-объектом'}
+            continue
+        yield line_num, row, None
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _integer(value):
+    """Целое из строки CSV или числа JSON; дробные числа и true/false не принимаются"""
+    if isinstance(value, (bool, float)):
+        raise ValueError(value)
+    return int(value)
+
+
+def _number(value):
+    if isinstance(value, bool):
+        raise ValueError(value)
+    return float(value)
+
+
+def _composition(value):
+    if isinstance(value, str):
+        value = value.strip()
+        if value[:1] in '[{':
+            try:
+                return json.loads(value)
+            except ValueError:
+                pass
+    return value
+
+
+def validate_row(row):
+    """Проверить строку импорта; возвращает (значения, ошибки по полям)"""
+    errors = {}
+    values = {}
+
+    # В CSV все значения - строки, в NDJSON типы JSON проверяются явно
+    for field in ('sku', 'description', 'occasion', 'image_url'):
+        value = row.get(field)
+        if _blank(value):
+            continue
+        if isinstance(value, str):
+            values[field] = value.strip()
+        else:
+            errors[field] = 'Должно быть строкой'
+
+    if not _blank(row.get('id')):
+        try:
+            values['id'] = _integer(row['id'])
+        except (TypeError, ValueError):
+            errors['id'] = 'Должен быть целым числом'
+
+    name = row.get('name')
+    if _blank(name):
+        errors['name'] = 'Обязательное поле'
+    elif not isinstance(name, str):
+        errors['name'] = 'Должно быть строкой'
+    else:
+        values['name'] = name.strip()
+
+    try:
+        values['price'] = _number(row.get('price'))
+        if not 0 < values['price'] < float('inf'):
+            errors['price'] = 'Должна быть больше нуля'
+    except (TypeError, ValueError):
+        errors['price'] = 'Должна быть числом'
+
+    stock = row.get('stock_quantity')
+    try:
+        values['stock_quantity'] = 0 if _blank(stock) else _integer(stock)
+        if values['stock_quantity'] < 0:
+            errors['stock_quantity'] = 'Не может быть отрицательным'
+    except (TypeError, ValueError):
+        errors['stock_quantity'] = 'Должно быть целым числом'
+
+    size = row.get('size')
+    values['size'] = 'medium' if _blank(size) else size.strip() if isinstance(size, str) else size
+    if values['size'] not in SIZES:
+        errors['size'] = f"Допустимые значения: {', '.join(SIZES)}"
+
+    if not _blank(row.get('composition')):
+        values['composition'] = _composition(row['composition'])
+
+    for field, limit in _MAX_LENGTH.items():
+        if isinstance(values.get(field), str) and len(values[field]) > limit:
+            errors[field] = f'Не длиннее {limit} символов'
+
+    return values, errors
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def export_header(fmt):
+    if fmt == 'csv':
+        return _csv_line(FIELDS)
+    return ''
+
+
+def export_row(fmt, row):
+    """Строка экспорта; row - словарь с ключами FIELDS"""
+    if fmt == 'ndjson':
+        return json.dumps({field: row[field] for field in FIELDS}, ensure_ascii=False) + '\n'
+
+    values = []
+    for field in FIELDS:
+        value = row[field]
+        if isinstance(value, (list, dict)):
+            value = json.dumps(value, ensure_ascii=False)
+        values.append('' if value is None else value)
+    return _csv_line(values)
+
+
+def _csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
@@ -0,0 +1,212 @@
+"""
+Профилирование запросов Lumme на работающем сервере
+Семплирующий профилировщик (стек потока запроса снимается из фонового потока
+раз в interval секунд) подключается как WSGI-middleware и пишет стеки в
+свернутом формате (folded: "кадр;кадр;кадр количество"), который понимают
+flamegraph.pl, speedscope и inferno. Профилируются запросы с подписанным
+заголовком X-Profile и каждый N-й запрос к выбранному маршруту.
+
+    python profiler.py sign --ttl 600   # значение заголовка X-Profile (нужен PROFILE_SECRET)
+"""
+
+import argparse
+import glob
+import hashlib
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+from werkzeug.exceptions import HTTPException
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+
+def sign_profile_token(secret, ttl):
+    """Значение заголовка X-Profile: срок действия и HMAC-SHA256 от него"""
+    expires = int(time.time() + ttl)
+    signature = hmac.new(secret.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f'{expires}.{signature}'
+
+
+def verify_profile_token(secret, token):
+    expires, _, signature = token.partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
+
+class Sampler:
+    """
+    Снимает стек потока thread_id, пока не вызван stop().
+
+    Поток профилировщика получает GIL не чаще sys.getswitchinterval()
+    (5 мс по умолчанию), поэтому на время профилирования интервал
+    переключения уменьшается до интервала выборок.
+    """
+
+    _active = 0
+    _active_lock = threading.Lock()
+    _switch_interval = None
+
+    def __init__(self, thread_id, interval, root_codes):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_codes = root_codes
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        with Sampler._active_lock:
+            if Sampler._active == 0:
+                Sampler._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self.interval, Sampler._switch_interval))
+            Sampler._active += 1
+        self._thread.start()
+
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        # Незавершенное тело ответа может быть собрано GC в потоке профилировщика
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        with Sampler._active_lock:
+            Sampler._active -= 1
+            if Sampler._active == 0:
+                sys.setswitchinterval(Sampler._switch_interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            # От текущего кадра до middleware: кадры сервера (gunicorn) не нужны
+            while frame is not None and frame.f_code not in self.root_codes:
+                code = frame.f_code
+                module = frame.f_globals.get('__name__', os.path.basename(code.co_filename))
+                label = f'{module}.{code.co_qualname}:{code.co_firstlineno}'
+                stack.append(label.replace(';', ':'))
+                frame = frame.f_back
+            frame = None  # не держать кадры запроса между выборками
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+class ProfilingMiddleware:
+    """
+    WSGI-middleware: профиль охватывает маршрутизацию Flask, view,
+    сериализацию JSON, SQLAlchemy и отдачу потоковых ответов.
+
+    sample_route - маршрут в виде 'GET /api/products' (шаблон правила Flask),
+    каждый sample_rate-й его запрос в воркере профилируется. В directory
+    хранится не больше max_files профилей, старые удаляются.
+    """
+
+    def __init__(self, app, directory, secret=None, interval=0.001,
+                 sample_route=None, sample_rate=0, max_files=100):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.directory = directory
+        self.secret = secret
+        self.interval = interval
+        self.sample_route = sample_route
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self._counter = itertools.count(1)
+        self._sequence = itertools.count(1)
+        self._root_codes = {self.__call__.__code__, self._profiled_body.__code__}
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, environ, start_response):
+        reason = self._reason(environ)
+        if reason is None:
+            return self.wsgi_app(environ, start_response)
+
+        sampler = Sampler(threading.get_ident(), self.interval, self._root_codes)
+        name = self._file_name(environ)
+
+        def profiled_start_response(status, headers, exc_info=None):
+            if reason == 'header':
+                headers = list(headers) + [('X-Profile-File', name)]
+            return start_response(status, headers, exc_info)
+
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            body = self.wsgi_app(environ, profiled_start_response)
+        except BaseException:
+            sampler.stop()
+            raise
+        return self._profiled_body(body, sampler, name, started)
+
+    def _profiled_body(self, body, sampler, name, started):
+        # Потоковые ответы (выгрузка товаров) формируются при чтении тела
+        try:
+            yield from body
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+            sampler.stop()
+            self._write(name, sampler.stacks, time.perf_counter() - started)
+
+    def _reason(self, environ):
+        token = environ.get(PROFILE_HEADER)
+        if token and self.secret and verify_profile_token(self.secret, token):
+            return 'header'
+        if self.sample_rate and self.sample_route:
+            method, _, rule = self.sample_route.partition(' ')
+            if environ.get('REQUEST_METHOD') == method and self._rule(environ) == rule:
+                if next(self._counter) % self.sample_rate == 0:
+                    return 'sample'
+        return None
+
+    def _rule(self, environ):
+        try:
+            rule, _ = self.app.url_map.bind_to_environ(environ).match(return_rule=True)
+        except HTTPException:
+            return None
+        return rule.rule
+
+    def _file_name(self, environ):
+        path = environ.get('PATH_INFO', '').strip('/').replace('/', '_') or 'root'
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence)}-{environ.get('REQUEST_METHOD')}-{path[:80]}.folded"
+
+    def _write(self, name, stacks, elapsed):
+        path = os.path.join(self.directory, name)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        os.replace(tmp_path, path)
+        self.app.logger.info('Профиль %s: %.1f мс, %d выборок', name, elapsed * 1000, sum(stacks.values()))
+
+        profiles = sorted(glob.glob(os.path.join(self.directory, '*.folded')))  # имя начинается со времени
+        for old in profiles[:-self.max_files]:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass  # удален другим воркером
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    sign = subparsers.add_parser('sign', help='Подписать заголовок X-Profile')
+    sign.add_argument('--ttl', type=int, default=600, help='срок действия, секунды')
+    args = parser.parse_args()
+
+    load_dotenv()
+    secret = os.getenv('PROFILE_SECRET')
+    if not secret:
+        parser.error('PROFILE_SECRET не задан')
+    print(sign_profile_token(secret, args.ttl))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Статистика SQL-запросов Lumme
+Подсчет запросов и времени БД в рамках одного HTTP-запроса
+и проверка объявленных для маршрутов бюджетов запросов
+"""
+
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    if has_request_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+        g.sql_time = g.get('sql_time', 0.0) + elapsed
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute не вызывается для упавшего запроса
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_start_time'):
+        conn.info['query_start_time'].pop()
+
+
+def get_query_stats():
+    """Количество запросов и суммарное время БД (секунды) для текущего запроса"""
+    return {
+        'count': g.get('sql_query_count', 0),
+        'time': g.get('sql_time', 0.0)
+    }
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Маршрут выполнил больше SQL-запросов, чем объявлено в query_budget"""
+
+
+def query_budget(max_queries):
+    """
+    Объявить бюджет SQL-запросов маршрута.
+
+    max_queries - число или функция без аргументов, вычисляющая бюджет по
+    текущему request (например, для заказа - по количеству позиций).
+    Декоратор ставится под @app.route.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def current_query_budget(app):
+    """Бюджет запросов маршрута текущего запроса или None, если он не объявлен"""
+    view = app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    return budget() if callable(budget) else budget
+
+
+def init_query_stats(app):
+    """
+    Подключить счетчик запросов к приложению.
+
+    При QUERY_STATS_HEADERS=True ответы получают заголовки X-Query-Count,
+    X-DB-Time (мс) и X-Query-Budget, что позволяет проверять количество
+    запросов в тестах. QUERY_BUDGET_MODE задает реакцию на превышение
+    бюджета маршрута: off, log (предупреждение в лог) или raise
+    (QueryBudgetExceeded - для тестов и проверок перед выкладкой).
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    @app.after_request
+    def add_query_stats_headers(response):
+        mode = app.config.get('QUERY_BUDGET_MODE', 'off')
+        if not app.config.get('QUERY_STATS_HEADERS') and mode == 'off':
+            return response
+
+        stats = get_query_stats()
+        budget = current_query_budget(app)
+        if app.config.get('QUERY_STATS_HEADERS'):
+            response.headers['X-Query-Count'] = str(stats['count'])
+            response.headers['X-DB-Time'] = f"{stats['time'] * 1000:.2f}"
+            if budget is not None:
+                response.headers['X-Query-Budget'] = str(budget)
+
+        if budget is not None and stats['count'] > budget and mode != 'off':
+            message = (
+                f"{request.method} {request.path}: {stats['count']} SQL-запросов "
+                f"при бюджете {budget} ({stats['time'] * 1000:.1f} мс в БД)"
+            )
+            if mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            app.logger.warning('Превышен бюджет запросов: %s', message)
+        return response
@@ -0,0 +1,20 @@
+"""
+Пересчет агрегатов рейтингов товаров и продавцов по всем отзывам
+Используется после ручных правок отзывов или импорта данных
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+# Пересчет по всем отзывам не ограничивается statement_timeout
+os.environ.setdefault('DB_STATEMENT_TIMEOUT_MS', '0')
+os.environ['SLOW_QUERY_MS'] = '0'
+
+from app_extended import app, rebuild_rating_aggregates
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        print("🔄 Пересчет рейтингов...")
+        rebuild_rating_aggregates()
+        print("✅ Рейтинги товаров и продавцов пересчитаны")
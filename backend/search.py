@@ -0,0 +1,545 @@
+"""
+Полнотекстовый поиск букетов Lumme
+Стемминг русского языка (Snowball), транслитерация кириллица <-> латиница,
+инвертированный индекс в памяти с ранжированием BM25 и подсказки по префиксу
+"""
+
+import bisect
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+
+# ============================================================================
+# СТЕММИНГ (алгоритм Snowball для русского языка без шага глаголов)
+# ============================================================================
+
+_VOWELS = set('аеиоуыэюя')
+
+_PERFECTIVE_GERUND = (('в', 'вши', 'вшись'), ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+_ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом',
+    'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею'
+)
+_PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+_REFLEXIVE = ('ся', 'сь')
+_NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'ей', 'ой', 'ий', 'й',
+    'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я'
+)
+_SUPERLATIVE = ('ейше', 'ейш')
+_DERIVATIONAL = ('ость', 'ост')
+
+
+def _by_length(endings):
+    return sorted(endings, key=len, reverse=True)
+
+
+def _remove(rv, endings, after_a=False):
+    """Удалить самое длинное окончание; after_a - окончание должно идти после 'а' или 'я'"""
+    for ending in endings:
+        if rv.endswith(ending):
+            rest = rv[:-len(ending)]
+            if after_a and not rest.endswith(('а', 'я')):
+                continue
+            return rest, True
+    return rv, False
+
+
+def _remove_grouped(rv, groups):
+    """Окончания группы 1 требуют предшествующей 'а'/'я', группы 2 - нет"""
+    first, second = groups
+    rest, found = _remove(rv, second)
+    if found:
+        return rest, True
+    return _remove(rv, first, after_a=True)
+
+
+_PERFECTIVE_GERUND = tuple(_by_length(group) for group in _PERFECTIVE_GERUND)
+_PARTICIPLE = tuple(_by_length(group) for group in _PARTICIPLE)
+_ADJECTIVE = _by_length(_ADJECTIVE)
+_NOUN = _by_length(_NOUN)
+
+
+def _region(word, start):
+    """Начало области после первой согласной, следующей за гласной (R1/R2)"""
+    for i in range(start + 1, len(word)):
+        if word[i - 1] in _VOWELS and word[i] not in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+def stem(word):
+    """Основа русского слова (слово в нижнем регистре)"""
+    word = word.replace('ё', 'е')
+
+    rv_start = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1: деепричастие или возвратная частица + прилагательное/существительное.
+    # Глагольные окончания не срезаются: в каталоге почти одни существительные
+    # и прилагательные, а -ны/-на ошибочно отрезались бы от них (тюльпаны -> тюльпа)
+    rv, found = _remove_grouped(rv, _PERFECTIVE_GERUND)
+    if not found:
+        rv, _ = _remove(rv, _REFLEXIVE)
+        rv, found = _remove(rv, _ADJECTIVE)
+        if found:
+            rv, _ = _remove_grouped(rv, _PARTICIPLE)
+        else:
+            rv, _ = _remove(rv, _NOUN)
+
+    # Шаг 2
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательное окончание в R2
+    r2_start = _region(word, _region(word, 0))
+    for ending in _DERIVATIONAL:
+        if rv.endswith(ending) and rv_start + len(rv) - len(ending) >= r2_start:
+            rv = rv[:-len(ending)]
+            break
+
+    # Шаг 4
+    rv, superlative = _remove(rv, _SUPERLATIVE)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not superlative and rv.endswith('ь'):
+        rv = rv[:-1]
+
+    return prefix + rv
+
+
+# ============================================================================
+# ТРАНСЛИТЕРАЦИЯ
+# ============================================================================
+
+_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh',
+    'щ': 'sch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya'
+}
+
+_TO_CYRILLIC = sorted({
+    'shch': 'щ', 'sch': 'щ', 'zh': 'ж', 'kh': 'х', 'ts': 'ц', 'ch': 'ч', 'sh': 'ш',
+    'yu': 'ю', 'ya': 'я', 'yo': 'ё', 'ju': 'ю', 'ja': 'я',
+    'a': 'а', 'b': 'б', 'c': 'к', 'd': 'д', 'e': 'е', 'f': 'ф', 'g': 'г', 'h': 'х', 'i': 'и',
+    'j': 'й', 'k': 'к', 'l': 'л', 'm': 'м', 'n': 'н', 'o': 'о', 'p': 'п', 'q': 'к', 'r': 'р',
+    's': 'с', 't': 'т', 'u': 'у', 'v': 'в', 'w': 'в', 'x': 'кс', 'y': 'ы', 'z': 'з'
+}.items(), key=lambda item: len(item[0]), reverse=True)
+
+_CYRILLIC = re.compile('[а-яё]')
+_TOKEN = re.compile(r'[0-9a-zа-яё]+')
+
+STOP_WORDS = {'и', 'в', 'во', 'с', 'со', 'на', 'для', 'из', 'к', 'по', 'от', 'до', 'а', 'о', 'у'}
+
+
+_TO_LATIN_TABLE = str.maketrans(_TO_LATIN)
+
+
+def to_latin(text):
+    return text.translate(_TO_LATIN_TABLE)
+
+
+def to_cyrillic(text):
+    """Транслитерация латиницы в кириллицу (жадно, сначала многобуквенные сочетания)"""
+    result, i = [], 0
+    while i < len(text):
+        for latin, cyrillic in _TO_CYRILLIC:
+            if text.startswith(latin, i):
+                result.append(cyrillic)
+                i += len(latin)
+                break
+        else:
+            result.append(text[i])
+            i += 1
+    return ''.join(result)
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+@lru_cache(maxsize=65536)
+def index_term(token):
+    """Термин индекса: основа русского слова в латинице или латинское слово как есть"""
+    if _CYRILLIC.search(token):
+        return to_latin(stem(token))
+    return token
+
+
+def query_terms(token):
+    """Варианты термина для слова запроса: латиница может быть транслитом русского слова"""
+    terms = {index_term(token)}
+    if not _CYRILLIC.search(token) and not token.isdigit():
+        terms.add(to_latin(stem(to_cyrillic(token))))
+    return terms
+
+
+def field_text(value):
+    """Текст поля; composition может быть строкой, списком или словарем"""
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        return ' '.join(f'{key} {item}' for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return ' '.join(field_text(item) for item in value)
+    return str(value)
+
+
+# ============================================================================
+# ИНВЕРТИРОВАННЫЙ ИНДЕКС
+# ============================================================================
+
+FIELD_WEIGHTS = {'name': 3.0, 'composition': 2.0, 'description': 1.0}
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс товаров с ранжированием BM25F.
+
+    Индекс живет в памяти воркера: обновляется сразу при записи товаров
+    этим воркером, а изменения из других воркеров подтягиваются не реже
+    одного раза в refresh_interval секунд (см. refresh_due / mark_synced).
+
+    Каждому документу выделяется строка в массивах NumPy (длина, наличие),
+    списки вхождений термина превращаются в массивы при первом поиске после
+    изменения, поэтому оценка запроса не перебирает документы в Python.
+    """
+
+    def __init__(self, refresh_interval=30, k1=1.2, b=0.75, timer=time.monotonic):
+        self.refresh_interval = refresh_interval
+        self.k1 = k1
+        self.b = b
+        self.timer = timer
+        self.watermark = None
+        self._postings = defaultdict(dict)
+        self._docs = {}
+        self._total_length = 0.0
+        self._slots = {}
+        self._slot_ids = np.zeros(1024, dtype=np.int64)
+        self._lengths = np.zeros(1024)
+        self._in_stock = np.zeros(1024, dtype=bool)
+        self._term_arrays = {}
+        self._synced_at = None
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def ready(self):
+        """Построен ли индекс (завершена первая синхронизация)"""
+        return self._synced_at is not None
+
+    def ids(self):
+        with self._lock:
+            return set(self._docs)
+
+    def add(self, doc_id, fields, in_stock=True):
+        """Добавить или заменить документ; fields - {поле: текст}"""
+        weights = defaultdict(float)
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for token in tokenize(field_text(text)):
+                weights[index_term(token)] += weight
+
+        with self._lock:
+            self._remove(doc_id)
+            for term, weight in weights.items():
+                self._postings[term][doc_id] = weight
+                self._term_arrays.pop(term, None)
+            length = sum(weights.values())
+            self._docs[doc_id] = (length, in_stock, tuple(weights))
+            self._total_length += length
+            slot = self._slot(doc_id)
+            self._lengths[slot] = length
+            self._in_stock[slot] = in_stock
+
+    def _slot(self, doc_id):
+        slot = self._slots.get(doc_id)
+        if slot is None:
+            slot = self._slots[doc_id] = len(self._slots)
+            if slot == len(self._slot_ids):
+                self._slot_ids = np.concatenate([self._slot_ids, np.zeros_like(self._slot_ids)])
+                self._lengths = np.concatenate([self._lengths, np.zeros_like(self._lengths)])
+                self._in_stock = np.concatenate([self._in_stock, np.zeros_like(self._in_stock)])
+            self._slot_ids[slot] = doc_id
+        return slot
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        length, _, terms = doc
+        self._total_length -= length
+        slot = self._slots[doc_id]
+        self._lengths[slot] = 0
+        self._in_stock[slot] = False
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            self._term_arrays.pop(term, None)
+            if not postings:
+                del self._postings[term]
+
+    def _term_array(self, term):
+        """Строки документов термина и веса вхождений (кэш до изменения термина)"""
+        arrays = self._term_arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            slots = np.fromiter((self._slots[doc_id] for doc_id in postings), dtype=np.int64, count=len(postings))
+            tf = np.fromiter(postings.values(), dtype=float, count=len(postings))
+            arrays = self._term_arrays[term] = (slots, tf)
+        return arrays
+
+    def search(self, query, limit=None):
+        """
+        Поиск товаров в наличии: (количество найденных, [(id, score)]).
+
+        Возвращаются первые limit результатов (все, если limit не задан)
+        по убыванию релевантности, при равной релевантности - по id.
+        """
+        tokens = tokenize(query)
+
+        with self._lock:
+            if not self._docs or not tokens:
+                return 0, []
+            count = len(self._docs)
+            avg_length = self._total_length / count or 1.0
+            scores = np.zeros(len(self._slots))
+
+            for token in tokens:
+                # Для каждого слова берется лучший из вариантов (кириллица / транслит)
+                best = np.zeros(len(self._slots))
+                for term in query_terms(token):
+                    arrays = self._term_array(term)
+                    if arrays is None:
+                        continue
+                    slots, tf = arrays
+                    idf = math.log(1 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._lengths[slots] / avg_length)
+                    best[slots] = np.maximum(best[slots], idf * tf * (self.k1 + 1) / norm)
+                scores += best
+
+            found = np.flatnonzero((scores > 0) & self._in_stock[:len(scores)])
+            found_scores = scores[found]
+            total = len(found)
+            if limit is not None and limit < len(found):
+                # Первые limit по оценке вместе со всеми равными последней из них
+                threshold = np.partition(found_scores, len(found) - limit)[len(found) - limit]
+                top = found_scores >= threshold
+                found, found_scores = found[top], found_scores[top]
+            ids = self._slot_ids[found]
+
+        order = np.lexsort((ids, -found_scores))[:limit]
+        return total, [(int(ids[i]), float(found_scores[i])) for i in order]
+
+    def refresh_due(self):
+        """Пора ли синхронизироваться с БД (индекс еще не построен или устарел)"""
+        return self._synced_at is None or self.timer() - self._synced_at >= self.refresh_interval
+
+    def begin_refresh(self):
+        """Захватить синхронизацию; False, если она уже выполняется"""
+        return self._refresh_lock.acquire(blocking=False)
+
+    def mark_synced(self, watermark=None):
+        """Запомнить момент синхронизации и максимальный updated_at загруженных товаров"""
+        if watermark is not None and (self.watermark is None or watermark > self.watermark):
+            self.watermark = watermark
+        self._synced_at = self.timer()
+
+    def end_refresh(self):
+        self._refresh_lock.release()
+
+    def expire(self):
+        """Синхронизироваться при следующем поиске (после массовых изменений)"""
+        if self._synced_at is not None:
+            self._synced_at = self.timer() - self.refresh_interval
+
+    def set_in_stock(self, doc_id, in_stock):
+        with self._lock:
+            doc = self._docs.get(doc_id)
+            if doc is not None:
+                self._docs[doc_id] = (doc[0], in_stock, doc[2])
+                self._in_stock[self._slots[doc_id]] = in_stock
+
+
+# ============================================================================
+# ПОДСКАЗКИ ПО ПРЕФИКСУ
+# ============================================================================
+
+# Окончания прилагательных в составе ("15 красных роз") - это не названия цветов
+_ADJECTIVE_FORMS = ('ых', 'ые', 'ый', 'ая', 'ое', 'ую', 'ого', 'ими', 'ыми')
+_UNIT_WORDS = {'шт', 'штук', 'штуки', 'ветка', 'ветки', 'веток'}
+
+# Порядок типов подсказок при равной популярности
+SUGGEST_KINDS = ('occasion', 'flower', 'name')
+
+
+def parse_flowers(composition):
+    """Названия цветов из состава: '15 красных роз, зелень' -> ['роз', 'зелень']"""
+    if isinstance(composition, dict):
+        parts = [str(key) for key in composition]
+    elif isinstance(composition, (list, tuple)):
+        parts = [field_text(item) for item in composition]
+    else:
+        parts = re.split(r'[,;\n]', field_text(composition))
+
+    flowers = []
+    for part in parts:
+        words = [
+            word for word in _TOKEN.findall(part.lower())
+            if not word.isdigit() and word not in STOP_WORDS and word not in _UNIT_WORDS
+        ]
+        noun = next((word for word in words if not word.endswith(_ADJECTIVE_FORMS)), None)
+        if noun:
+            flowers.append(noun)
+    return flowers
+
+
+def normalize_prefix(text):
+    return ' '.join(text.lower().replace('ё', 'е').split())
+
+
+class SuggestIndex:
+    """
+    Подсказки для поиска по мере ввода: названия товаров, поводы и цветы.
+
+    Ключи (каждое слово фразы до ее конца, в кириллице и латинице) хранятся
+    в отсортированном списке, префикс ищется через bisect. Для каждого
+    товара запоминаются его фразы, поэтому изменение товара обновляет
+    только затронутые ключи. При начальной загрузке (bulk) список
+    сортируется один раз в конце, а не вставкой каждого ключа.
+    """
+
+    def __init__(self, scan_limit=500):
+        self.scan_limit = scan_limit
+        self._keys = []
+        self._key_refs = Counter()
+        self._forms = defaultdict(Counter)
+        self._by_product = {}
+        self._bulk = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._forms)
+
+    def add(self, product_id, name=None, occasion=None, occasion_label=None, composition=None):
+        """Добавить или заменить фразы товара"""
+        phrases = []
+        if name:
+            phrases.append((('name', normalize_prefix(name)), name.strip()))
+        if occasion:
+            phrases.append((('occasion', occasion), occasion_label or occasion))
+        for flower in dict.fromkeys(parse_flowers(composition)):
+            phrases.append((('flower', index_term(flower)), flower))
+
+        with self._lock:
+            self._remove(product_id)
+            self._by_product[product_id] = phrases
+            for term, form in phrases:
+                self._forms[term][form] += 1
+                for key in self._phrase_keys(form):
+                    self._ref(key, term, 1)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    @contextmanager
+    def bulk(self):
+        """Массовая загрузка: список ключей строится одной сортировкой при выходе"""
+        with self._lock:
+            self._bulk = True
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._bulk = False
+                self._keys = sorted(self._key_refs)
+
+    def _remove(self, product_id):
+        for term, form in self._by_product.pop(product_id, ()):
+            forms = self._forms[term]
+            forms[form] -= 1
+            if forms[form] <= 0:
+                del forms[form]
+            if not forms:
+                del self._forms[term]
+            for key in self._phrase_keys(form):
+                self._ref(key, term, -1)
+
+    def _ref(self, key, term, delta):
+        entry = (key, term)
+        self._key_refs[entry] += delta
+        if self._bulk:
+            if self._key_refs[entry] <= 0:
+                del self._key_refs[entry]
+        elif delta > 0 and self._key_refs[entry] == 1:
+            bisect.insort(self._keys, entry)
+        elif self._key_refs[entry] <= 0:
+            del self._key_refs[entry]
+            position = bisect.bisect_left(self._keys, entry)
+            if position < len(self._keys) and self._keys[position] == entry:
+                del self._keys[position]
+
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def _phrase_keys(form):
+        """Ключи фразы: с каждого слова до конца фразы, в кириллице и латинице"""
+        words = normalize_prefix(form).split()
+        keys = set()
+        for i in range(len(words)):
+            key = ' '.join(words[i:])
+            keys.add(key)
+            keys.add(to_latin(key))
+        return frozenset(keys)
+
+    def suggest(self, prefix, limit=8):
+        """Подсказки [{'text', 'type', 'value', 'products'}] по убыванию популярности"""
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+
+        prefixes = {prefix}
+        if not _CYRILLIC.search(prefix):
+            # "hriz" -> "хриз" -> "khriz": совпадает с ключом в нашей транслитерации
+            prefixes.add(to_latin(to_cyrillic(prefix)))
+
+        with self._lock:
+            terms = set()
+            for value in prefixes:
+                position = bisect.bisect_left(self._keys, (value,))
+                for key, term in self._keys[position:position + self.scan_limit]:
+                    if not key.startswith(value):
+                        break
+                    terms.add(term)
+
+            results = []
+            for term in terms:
+                # Во время массовой загрузки список ключей может отставать от фраз
+                forms = self._forms.get(term)
+                if not forms:
+                    continue
+                text = max(forms.items(), key=lambda item: (item[1], -len(item[0])))[0]
+                results.append({
+                    'text': text,
+                    'type': term[0],
+                    'value': term[1] if term[0] == 'occasion' else text,
+                    'products': sum(forms.values())
+                })
+
+        results.sort(key=lambda item: (-item['products'], SUGGEST_KINDS.index(item['type']), item['text']))
+        return results[:limit]
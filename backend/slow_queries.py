@@ -0,0 +1,176 @@
+"""
+Журнал медленных SQL-запросов Lumme
+Запросы дольше порога группируются по нормализованному SQL (литералы и
+параметры заменены на ?, списки IN и VALUES свернуты) вместе с маршрутом,
+типами параметров и планом выполнения, который снимается в фоновом потоке
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+# Планы снимаются отдельным соединением, пока запросы ждут в ограниченной очереди
+EXPLAIN_PREFIX = {
+    'postgresql': 'EXPLAIN (ANALYZE off) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|\?|(?<!:):\w+|\$\d+|\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """SQL без значений: запросы, отличающиеся только параметрами, попадают в одну группу"""
+    sql = _STRING.sub('?', statement)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    sql = _ROWS.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def parameter_shape(parameters, executemany=False):
+    """Типы параметров без значений: 'int × 50, str' или '100 × (int, str)'"""
+    if executemany:
+        rows = list(parameters)
+        return f'{len(rows)} × ({parameter_shape(rows[0]) if rows else ""})'
+    values = parameters.values() if isinstance(parameters, dict) else parameters or ()
+    runs = []
+    for value in values:
+        name = 'NULL' if value is None else type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return ', '.join(name if count == 1 else f'{name} × {count}' for name, count in runs)
+
+
+class SlowQueryLog:
+    """
+    Медленные запросы воркера, сгруппированные по нормализованному SQL.
+
+    Значения параметров не хранятся: они нужны только фоновому потоку для
+    EXPLAIN первого запроса группы. План снимается без ANALYZE, то есть
+    запрос повторно не выполняется. Групп не больше max_groups; запросы
+    новых групп сверх лимита только пишутся в лог.
+    """
+
+    def __init__(self, threshold, logger, explain=True, max_groups=200, max_pending=50):
+        self.threshold = threshold
+        self.logger = logger
+        self.explain = explain
+        self.max_groups = max_groups
+        self._groups = {}
+        self._lock = threading.Lock()
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._worker = None
+        self._worker_pid = None
+
+    def __len__(self):
+        return len(self._groups)
+
+    def attach(self, engine):
+        """Подписаться на выполнение запросов движка"""
+        self.engine = engine
+        self._explain_prefix = EXPLAIN_PREFIX.get(engine.dialect.name)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+    def _handle_error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('slow_query_start'):
+            conn.info['slow_query_start'].pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['slow_query_start'].pop()
+        if elapsed >= self.threshold and not conn.info.get('slow_query_explain'):
+            self.record(statement, parameters, elapsed, executemany)
+
+    def record(self, statement, parameters, elapsed, executemany=False):
+        sql = normalize_sql(statement)
+        route = 'вне запроса'
+        if has_request_context():
+            route = f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+        shape = parameter_shape(parameters, executemany)
+
+        with self._lock:
+            group = self._groups.get(sql)
+            if group is None and len(self._groups) < self.max_groups:
+                group = self._groups[sql] = {
+                    'sql': sql, 'count': 0, 'total': 0.0, 'max': 0.0,
+                    'routes': Counter(), 'parameters': shape, 'plan': None,
+                }
+                self._schedule_explain(group, statement, parameters, executemany)
+            if group is not None:
+                group['count'] += 1
+                group['total'] += elapsed
+                group['max'] = max(group['max'], elapsed)
+                group['routes'][route] += 1
+
+        self.logger.warning('Медленный запрос %.1f мс (%s; параметры: %s): %s', elapsed * 1000, route, shape, sql)
+
+    def _schedule_explain(self, group, statement, parameters, executemany):
+        if not self.explain or self._explain_prefix is None:
+            return
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        try:
+            self._pending.put_nowait((group, statement, parameters))
+        except queue.Full:
+            return
+        # Поток создается в процессе воркера (после fork gunicorn потоки не наследуются)
+        if self._worker is None or self._worker_pid != os.getpid():
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._explain_loop, name='slow-query-explain', daemon=True)
+            self._worker.start()
+
+    def _explain_loop(self):
+        while True:
+            group, statement, parameters = self._pending.get()
+            try:
+                with self.engine.connect() as conn:
+                    conn.info['slow_query_explain'] = True
+                    try:
+                        rows = conn.exec_driver_sql(self._explain_prefix + statement, parameters).fetchall()
+                    finally:
+                        conn.info.pop('slow_query_explain', None)
+                plan = '\n'.join(' | '.join(str(value) for value in row) for row in rows)
+            except Exception as e:
+                plan = f'EXPLAIN не выполнен: {e}'
+            with self._lock:
+                group['plan'] = plan
+            self.logger.warning('План медленного запроса: %s\n%s', group['sql'], plan)
+
+    def report(self, limit=50):
+        """Группы по убыванию суммарного времени (мс)"""
+        with self._lock:
+            groups = sorted(self._groups.values(), key=lambda group: group['total'], reverse=True)[:limit]
+            return [{
+                'sql': group['sql'],
+                'count': group['count'],
+                'total_ms': round(group['total'] * 1000, 1),
+                'avg_ms': round(group['total'] * 1000 / group['count'], 1),
+                'max_ms': round(group['max'] * 1000, 1),
+                'routes': dict(group['routes'].most_common()),
+                'parameters': group['parameters'],
+                'plan': group['plan'],
+            } for group in groups]
+
+    def clear(self):
+        with self._lock:
+            self._groups.clear()
@@ -0,0 +1,299 @@
+"""
+Общий снимок каталога Lumme
+Столбцовый файл с товарами в наличии, отображаемый в память (mmap) всеми
+воркерами gunicorn: фильтрация, сортировка и пагинация каталога без запросов к БД.
+Столбцы читаются как массивы NumPy, порядок строк для каждой сортировки
+вычисляется при сборке и хранится в том же файле
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: пересборки не сериализуются между процессами
+    fcntl = None
+
+MAGIC = b'LUMMECS3'
+_HEADER = struct.Struct('<8sII')  # magic, длина JSON-заголовка, количество строк
+_ALIGN = 8
+
+# Столбцы снимка: (имя, тип NumPy); по убыванию размера элемента
+COLUMNS = (
+    ('id', '<i8'),
+    ('seller_id', '<i8'),
+    ('price', '<f8'),
+    ('rating', '<f8'),
+    ('created_at', '<f8'),
+    ('sold_count', '<i8'),
+    ('stock', '<i4'),
+    ('occasion', '<i2'),
+    ('size', '<i2'),
+)
+
+# Порядок строк для сортировки: номера строк, упорядоченные по ключам по возрастанию
+ORDER_DTYPE = '<i4'
+
+# Словарные столбцы: строковое значение хранится кодом, -1 - пустое значение
+DICTIONARY_COLUMNS = ('occasion', 'size')
+
+
+def _padding(length):
+    return -length % _ALIGN
+
+
+def write_snapshot(path, rows, orders=()):
+    """
+    Записать снимок атомарно: новый файл рядом с path, затем os.replace().
+
+    rows - словари с ключами COLUMNS (occasion/size - строки, created_at - datetime),
+    orders - наборы ключей сортировки (последний ключ - уникальный id).
+    Уже открытые воркерами отображения старого файла остаются валидными.
+    """
+    dictionaries = {name: [] for name in DICTIONARY_COLUMNS}
+    codes = {name: {} for name in DICTIONARY_COLUMNS}
+    values = {name: [] for name, _ in COLUMNS}
+
+    for row in rows:
+        for name, _ in COLUMNS:
+            value = row[name]
+            if name in codes:
+                if value is None:
+                    value = -1
+                else:
+                    value = codes[name].setdefault(value, len(codes[name]))
+                    if value == len(dictionaries[name]):
+                        dictionaries[name].append(row[name])
+            elif name == 'created_at':
+                value = value.timestamp() if value is not None else 0.0
+            elif value is None:
+                value = 0
+            values[name].append(value)
+
+    columns = {name: np.array(values[name], dtype=dtype) for name, dtype in COLUMNS}
+    count = len(columns['id'])
+    orders = [list(keys) for keys in orders]
+    meta = json.dumps({'dictionaries': dictionaries, 'orders': orders, 'built_at': time.time()}).encode()
+
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(meta), count))
+        f.write(meta)
+        f.write(b'\0' * _padding(_HEADER.size + len(meta)))
+        arrays = [columns[name] for name, _ in COLUMNS]
+        # np.lexsort сортирует по последнему ключу, затем по предпоследнему
+        arrays += [np.lexsort([columns[key] for key in reversed(keys)]).astype(ORDER_DTYPE) for keys in orders]
+        for array in arrays:
+            data = array.tobytes()
+            f.write(data)
+            f.write(b'\0' * _padding(len(data)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+class SnapshotView:
+    """Открытый снимок: столбцы - массивы NumPy поверх общего отображения файла"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, meta_length, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path}: не файл снимка каталога')
+
+        offset = _HEADER.size
+        meta = json.loads(self._mmap[offset:offset + meta_length])
+        offset += meta_length + _padding(offset + meta_length)
+
+        self.count = count
+        self.built_at = meta['built_at']
+        self.dictionaries = meta['dictionaries']
+        self.codes = {
+            name: {value: code for code, value in enumerate(values)}
+            for name, values in self.dictionaries.items()
+        }
+
+        self.columns = {}
+        for name, dtype in COLUMNS:
+            self.columns[name], offset = self._array(dtype, offset)
+        self.orders = {}
+        for keys in meta['orders']:
+            self.orders[tuple(keys)], offset = self._array(ORDER_DTYPE, offset)
+
+    def _array(self, dtype, offset):
+        if not self.count:
+            return np.empty(0, dtype=dtype), offset
+        array = np.frombuffer(self._mmap, dtype=dtype, count=self.count, offset=offset)
+        return array, offset + array.nbytes + _padding(array.nbytes)
+
+    def __len__(self):
+        return self.count
+
+    def select(self, occasion=None, size=None, min_price=0, max_price=float('inf')):
+        """Маска строк, подходящих под фильтры каталога"""
+        mask = np.ones(self.count, dtype=bool)
+
+        for name, value in (('occasion', occasion), ('size', size)):
+            if value:
+                code = self.codes[name].get(value)
+                if code is None:
+                    return np.zeros(self.count, dtype=bool)
+                mask &= self.columns[name] == code
+
+        if min_price > 0 or max_price != float('inf'):
+            price = self.columns['price']
+            mask &= (price >= min_price) & (price <= max_price)
+        return mask
+
+    def sort(self, mask, keys, descending=False):
+        """Номера строк маски, упорядоченные по столбцам keys (последний - уникальный id)"""
+        order = self.orders.get(tuple(keys))
+        if order is None:
+            order = np.lexsort([self.columns[key] for key in reversed(keys)])
+        if descending:
+            order = order[::-1]
+        return order[mask[order]]
+
+    def ids(self, rows):
+        return self.columns['id'][rows].tolist()
+
+
+class CatalogSnapshot:
+    """
+    Снимок каталога, общий для воркеров.
+
+    Воркер, изменивший товары, заказывает пересборку файла (invalidate);
+    она выполняется в фоновом потоке воркера, а до открытия снимка,
+    собранного после изменения, current() возвращает None и запросы
+    воркера читают БД: своя запись видна сразу. Остальные воркеры замечают подмену файла по
+    stat() не реже раза в check_interval секунд, переоткрывают отображение
+    и вызывают on_change (например, сброс кэша). Снимок старше max_age
+    секунд пересобирается в фоне при чтении - так подхватываются изменения
+    в обход API. Пока снимка нет (первая сборка), current() возвращает None.
+    Для наборов ключей orders порядок строк вычисляется при сборке, а не
+    при каждом запросе.
+    """
+
+    def __init__(self, path, loader, orders=(), max_age=300, check_interval=1.0, on_change=None,
+                 logger=None, timer=time.monotonic):
+        self.path = path
+        self.loader = loader
+        self.orders = orders
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self.on_change = on_change
+        self.logger = logger
+        self.timer = timer
+        self._view = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+        # Заказанная пересборка: None - нет, False - если снимок устарел, True - обязательно
+        self._pending = None
+        self._pending_lock = threading.Lock()
+        # Поколения изменений: заказанное invalidate() и учтенное открытым снимком
+        self._generation = 0
+        self._opened_generation = 0
+        self._wakeup = threading.Event()
+        self._worker_pid = None
+
+    def current(self):
+        """Актуальный SnapshotView или None, если снимок еще не собран или не учел изменения воркера"""
+        if self._opened_generation < self._generation:
+            return None
+        with self._lock:
+            view = self._view
+            if view is not None and self.timer() - self._checked_at < self.check_interval:
+                return view
+            self._checked_at = self.timer()
+
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._schedule(force=False)
+                return view
+
+            if time.time() - stat.st_mtime > self.max_age:
+                self._schedule(force=False)
+            if view is None or (stat.st_ino, stat.st_mtime_ns) != (view.stat.st_ino, view.stat.st_mtime_ns):
+                try:
+                    self._open()
+                except ValueError:
+                    # Файл другого формата (например, от предыдущей версии приложения)
+                    self._schedule(force=True)
+            return self._view
+
+    def invalidate(self):
+        """Пересобрать снимок в фоне (после изменения товаров); до этого снимок не читается"""
+        with self._pending_lock:
+            self._generation += 1
+        self._schedule(force=True)
+
+    def rebuild(self):
+        """Пересобрать снимок из БД в текущем потоке (скрипты и бенчмарки)"""
+        self._rebuild(force=True, generation=self._generation)
+        return self._view
+
+    def _schedule(self, force):
+        with self._pending_lock:
+            self._pending = force or bool(self._pending)
+            self._wakeup.set()
+            # Поток создается в процессе воркера (после fork gunicorn потоки не наследуются)
+            if self._worker_pid != os.getpid():
+                self._worker_pid = os.getpid()
+                threading.Thread(target=self._rebuild_loop, name='catalog-snapshot', daemon=True).start()
+
+    def _rebuild_loop(self):
+        while True:
+            self._wakeup.wait()
+            # Изменения, заказанные во время сборки, вызовут еще одну сборку
+            with self._pending_lock:
+                self._wakeup.clear()
+                force, self._pending = self._pending, None
+                # Данные читаются после этого момента: сборка учитывает изменения до него
+                generation = self._generation
+            if force is None:
+                continue
+            try:
+                self._rebuild(force, generation)
+            except Exception as e:
+                if self.logger is not None:
+                    self.logger.warning('Не удалось пересобрать снимок каталога: %s', e)
+
+    def _rebuild(self, force=True, generation=None):
+        with open(f'{self.path}.lock', 'w') as lock:
+            if fcntl is not None:
+                # Пересборки разных воркеров выполняются по очереди, поэтому
+                # более старые данные не могут заменить более новые
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            # Устаревший снимок мог пересобрать другой воркер, пока мы ждали блокировку
+            if force or not self._is_fresh():
+                write_snapshot(self.path, self.loader(), self.orders)
+        with self._lock:
+            self._open()
+            if generation is not None and generation > self._opened_generation:
+                self._opened_generation = generation
+
+    def _is_fresh(self):
+        try:
+            return time.time() - os.stat(self.path).st_mtime <= self.max_age
+        except FileNotFoundError:
+            return False
+
+    def _open(self):
+        previous = self._view
+        self._view = SnapshotView(self.path)
+        self._checked_at = self.timer()
+        # Старое отображение освобождается сборщиком мусора, когда его
+        # перестанут использовать запросы, которые еще читают из него
+        if previous is not None and self.on_change is not None:
+            self.on_change()
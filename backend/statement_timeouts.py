@@ -0,0 +1,51 @@
+"""
+Таймауты SQL-запросов Lumme (PostgreSQL statement_timeout)
+Таймаут по умолчанию задается при подключении (DB_STATEMENT_TIMEOUT_MS);
+маршрут с @statement_timeout получает свой таймаут через SET LOCAL
+в каждой транзакции запроса
+"""
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+
+def statement_timeout(milliseconds):
+    """
+    Объявить statement_timeout маршрута (мс, 0 - без ограничения).
+
+    Декоратор ставится под @app.route, как query_budget.
+    """
+    def decorator(view):
+        view.statement_timeout = milliseconds
+        return view
+    return decorator
+
+
+def init_statement_timeouts(app, engine):
+    """
+    Подключить таймауты маршрутов к движку PostgreSQL.
+
+    SET LOCAL действует до конца транзакции, поэтому совместим с PgBouncer
+    в режиме transaction; в этом режиме (DB_PGBOUNCER) так же ставится и
+    таймаут по умолчанию. Команда выполняется курсором DBAPI в обход событий
+    SQLAlchemy и не учитывается в бюджетах запросов.
+    """
+    if engine.dialect.name != 'postgresql':
+        return
+    default = app.config['DB_STATEMENT_TIMEOUT_MS']
+    # Таймаут, уже действующий в соединении (задан при подключении)
+    connection_default = None if app.config['DB_PGBOUNCER'] else default
+
+    @event.listens_for(engine, 'begin')
+    def set_statement_timeout(conn):
+        if not has_request_context():
+            return
+        view = app.view_functions.get(request.endpoint)
+        timeout = getattr(view, 'statement_timeout', default)
+        if timeout == connection_default or (timeout == 0 and connection_default is None):
+            return
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute('SET LOCAL statement_timeout = %d' % int(timeout))
+        finally:
+            cursor.close()
@@ -0,0 +1,55 @@
+"""
+Общие настройки тестов: модули backend импортируются как в приложении,
+app_extended работает с временной SQLite БД и временным файлом снимка каталога
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['INIT_DB_ON_STARTUP'] = 'false'
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'tests.db')
+os.environ['CATALOG_SNAPSHOT_PATH'] = os.path.join(tempfile.mkdtemp(), 'tests.snapshot')
+os.environ['METRICS_ENABLED'] = 'False'
+os.environ['SLOW_QUERY_MS'] = '0'
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    """app_extended со схемой БД, созданной миграциями"""
+    import app_extended
+    import migrations
+
+    with app_extended.app.app_context():
+        migrations.upgrade(app_extended.db.engine, log=lambda message: None)
+    return app_extended
+
+
+@pytest.fixture(scope='session')
+def seller(app_module):
+    """Продавец для товаров тестов: (id продавца, заголовки с JWT)"""
+    db, User, Seller = app_module.db, app_module.User, app_module.Seller
+    with app_module.app.app_context():
+        user = User(email='seller@tests.lumme.tj', password_hash='!', user_type='seller')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Seller(user_id=user.id, shop_name='Тесты'))
+        db.session.commit()
+        token = app_module.create_user_token(user)
+        return user.seller.id, {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture(scope='session')
+def customer(app_module):
+    """Покупатель: заголовки с JWT"""
+    db, User, Customer = app_module.db, app_module.User, app_module.Customer
+    with app_module.app.app_context():
+        user = User(email='customer@tests.lumme.tj', password_hash='!', user_type='customer')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Customer(user_id=user.id))
+        db.session.commit()
+        return {'Authorization': f'Bearer {app_module.create_user_token(user)}'}
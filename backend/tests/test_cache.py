@@ -0,0 +1,49 @@
+"""Кэш каталога: версия, прочитанная до изменения каталога"""
+
+from cache import CatalogCache, MISSING
+
+
+def test_list_read_before_invalidate_is_not_cached():
+    """Страница, собранная до invalidate(), не отдается под новой версией"""
+    cache = CatalogCache()
+    key = (None, None, 0, float('inf'), 'newest', 1, 12)
+
+    version = cache.version
+    assert cache.get_list(key) is None
+    cache.invalidate()  # запись товара между чтением и сохранением
+    cache.set_list(key, {'data': ['старая страница']}, version)
+
+    assert cache.get_list(key) is None
+
+
+def test_count_and_facets_read_before_invalidate_are_not_cached():
+    cache = CatalogCache()
+
+    version = cache.version
+    cache.invalidate()
+    cache.set_count(('birthday',), 10, version)
+    cache.set_facets((0, 100), {'occasion': {}}, version)
+
+    assert cache.get_count(('birthday',)) is None
+    assert cache.get_facets((0, 100)) is None
+
+
+def test_product_read_before_invalidate_is_not_cached():
+    cache = CatalogCache()
+
+    version = cache.version
+    cache.invalidate()
+    cache.set_product(1, {'data': {'id': 1}}, version)
+    cache.set_missing(2, version)
+
+    assert cache.get_product(1) is None
+    assert cache.get_product(2) is None
+
+
+def test_entries_of_current_version_are_cached():
+    cache = CatalogCache()
+    cache.set_list(('page',), {'data': []}, cache.version)
+    cache.set_missing(2, cache.version)
+
+    assert cache.get_list(('page',)) == {'data': []}
+    assert cache.get_product(2) is MISSING
@@ -0,0 +1,50 @@
+"""Изменения товаров сразу видны в каталоге воркера (кэш и снимок включены)"""
+
+import time
+from datetime import date, timedelta
+
+
+def test_created_product_is_listed_immediately(app_module, seller):
+    _, headers = seller
+    client = app_module.app.test_client()
+    app_module.catalog_snapshot.rebuild()
+    query = {'sort': 'newest', 'per_page': 100}
+    client.get('/api/products', query_string=query)  # страница в кэше, снимок открыт
+
+    response = client.post('/api/products', headers=headers, json={'name': 'Новый букет', 'price': 150, 'stock_quantity': 3})
+    assert response.status_code == 201
+    product_id = response.get_json()['data']['id']
+
+    listed = [item['id'] for item in client.get('/api/products', query_string=query).get_json()['data']]
+    assert product_id in listed
+
+
+def test_order_updates_cached_stock(app_module, seller, customer, monkeypatch):
+    _, headers = seller
+    client = app_module.app.test_client()
+    product_id = client.post(
+        '/api/products', headers=headers, json={'name': 'Букет с остатком', 'price': 200, 'stock_quantity': 5}
+    ).get_json()['data']['id']
+    # Дожидаемся фоновой пересборки после создания товара: она тоже сбрасывает кэш
+    snapshot = app_module.catalog_snapshot
+    deadline = time.monotonic() + 5
+    while snapshot.current() is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    monkeypatch.setattr(app_module, 'catalog_snapshot', None)
+    query = {'sort': 'newest', 'per_page': 100}
+
+    def listed_stock():
+        items = client.get('/api/products', query_string=query).get_json()['data']
+        return next(item['stock_quantity'] for item in items if item['id'] == product_id)
+
+    assert listed_stock() == 5  # страница в кэше
+    response = client.post('/api/orders', headers=customer, json={
+        'items': [{'id': product_id, 'quantity': 2}],
+        'delivery_address': 'Душанбе, ул. Рудаки, 1',
+        'delivery_date': (date.today() + timedelta(days=2)).isoformat()
+    })
+    assert response.status_code == 201
+
+    assert listed_stock() == 3
+    assert client.get(f'/api/products/{product_id}').get_json()['data']['stock_quantity'] == 3
@@ -0,0 +1,61 @@
+"""GET /api/products?page=: номер страницы вне диапазона в снимке и в SQL"""
+
+import pytest
+
+PRODUCTS = 30
+
+
+@pytest.fixture(scope='module')
+def catalog(app_module, seller):
+    db, Product = app_module.db, app_module.Product
+    seller_id, _ = seller
+    with app_module.app.app_context():
+        db.session.execute(db.insert(Product), [
+            {'seller_id': seller_id, 'name': f'Букет {i}', 'price': 100 + i, 'stock_quantity': 5, 'is_in_stock': True}
+            for i in range(PRODUCTS)
+        ])
+        db.session.commit()
+        ids = [product_id for (product_id,) in db.session.query(Product.id).filter(Product.seller_id == seller_id)]
+    return app_module, ids
+
+
+@pytest.fixture(params=['snapshot', 'sql'])
+def client(request, catalog, monkeypatch):
+    app_module, _ = catalog
+    if request.param == 'snapshot':
+        app_module.catalog_snapshot.rebuild()
+    else:
+        monkeypatch.setattr(app_module, 'catalog_snapshot', None)
+    app_module.catalog_cache.invalidate()
+    return app_module.app.test_client()
+
+
+def first_page_ids(client):
+    response = client.get('/api/products', query_string={'sort': 'price_asc', 'per_page': 3, 'page': 1})
+    return [item['id'] for item in response.get_json()['data']]
+
+
+@pytest.mark.parametrize('page', [0, -1, -5])
+def test_page_below_one_is_first_page(client, page):
+    response = client.get('/api/products', query_string={'sort': 'price_asc', 'per_page': 3, 'page': page})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [item['id'] for item in body['data']] == first_page_ids(client)
+    assert body['pagination']['page'] == 1
+
+
+def test_per_page_below_one_is_one(client):
+    response = client.get('/api/products', query_string={'sort': 'price_asc', 'per_page': 0})
+
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == 1
+
+
+def test_page_after_last_is_empty(client):
+    response = client.get('/api/products', query_string={'sort': 'price_asc', 'per_page': 3, 'page': 1000})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['data'] == []
+    assert body['pagination']['total'] >= PRODUCTS
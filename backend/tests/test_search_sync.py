@@ -0,0 +1,39 @@
+"""Синхронизация поискового индекса с товарами, измененными другими воркерами"""
+
+from datetime import datetime
+
+
+def refresh(app_module):
+    app_module.search_index.expire()
+    assert app_module.search_index.begin_refresh()
+    app_module.refresh_search_index()
+
+
+def test_deleted_product_is_pruned_when_counts_match(app_module, seller):
+    db, Product = app_module.db, app_module.Product
+    seller_id, _ = seller
+    with app_module.app.app_context():
+        doomed = Product(seller_id=seller_id, name='Орхидея удаляемая', price=300, stock_quantity=2)
+        db.session.add(doomed)
+        db.session.flush()
+        # Удаляется не последний товар: SQLite не выдаст его id новому
+        db.session.add(Product(seller_id=seller_id, name='Тюльпаны', price=200, stock_quantity=2))
+        db.session.commit()
+        doomed_id = doomed.id
+    refresh(app_module)
+    assert doomed_id in app_module.search_index.ids()
+
+    # Товар удален, а добавленный в обход API (updated_at раньше окна синхронизации)
+    # в индекс не попадает: количество товаров в индексе и в БД совпадает
+    with app_module.app.app_context():
+        db.session.execute(db.delete(Product).where(Product.id == doomed_id))
+        db.session.execute(db.insert(Product), [{
+            'seller_id': seller_id, 'name': 'Орхидея новая', 'price': 300, 'stock_quantity': 2,
+            'is_in_stock': True, 'updated_at': datetime(2020, 1, 1)
+        }])
+        db.session.commit()
+    refresh(app_module)
+
+    assert doomed_id not in app_module.search_index.ids()
+    _, ranked = app_module.search_index.search('орхидея')
+    assert doomed_id not in [product_id for product_id, _ in ranked]
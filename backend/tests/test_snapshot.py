@@ -0,0 +1,74 @@
+"""Снимок каталога: изменения воркера видны до окончания фоновой пересборки"""
+
+import threading
+import time
+from datetime import datetime
+
+from snapshot import CatalogSnapshot
+
+
+def row(product_id):
+    return {
+        'id': product_id, 'seller_id': 1, 'price': 100.0, 'rating': 0.0, 'created_at': datetime(2024, 1, 1),
+        'sold_count': 0, 'stock': 1, 'occasion': None, 'size': 'medium'
+    }
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_snapshot_is_bypassed_until_rebuild_after_invalidate(tmp_path):
+    rows = [row(1)]
+    loading = threading.Event()
+    release = threading.Event()
+
+    def loader():
+        if len(rows) > 1:
+            loading.set()
+            release.wait(5)
+        return list(rows)
+
+    snapshot = CatalogSnapshot(str(tmp_path / 'catalog.snapshot'), loader, orders=[['id']])
+    snapshot.rebuild()
+    assert snapshot.current().ids(snapshot.current().select()) == [1]
+
+    rows.append(row(2))  # товар создан, запись зафиксирована
+    snapshot.invalidate()
+    assert loading.wait(5)
+    # Пересборка идет: прежний снимок без товара 2 не читается
+    assert snapshot.current() is None
+
+    release.set()
+    wait_for(lambda: snapshot.current() is not None)
+    view = snapshot.current()
+    assert view.ids(view.select()) == [1, 2]
+
+
+def test_invalidate_during_rebuild_waits_for_next_rebuild(tmp_path):
+    rows = [row(1)]
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(len(rows))
+        if len(calls) == 2:
+            release.wait(5)  # вторая сборка читает данные до второго изменения
+        return list(rows)
+
+    snapshot = CatalogSnapshot(str(tmp_path / 'catalog.snapshot'), loader, orders=[['id']])
+    snapshot.rebuild()
+
+    rows.append(row(2))
+    snapshot.invalidate()
+    wait_for(lambda: len(calls) == 2)
+    rows.append(row(3))
+    snapshot.invalidate()
+    release.set()
+
+    wait_for(lambda: len(calls) == 3 and snapshot.current() is not None)
+    view = snapshot.current()
+    assert view.ids(view.select()) == [1, 2, 3]
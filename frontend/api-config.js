@@ -89,6 +89,7 @@ class LummeAPI {
         if (filters.size) params.append('size', filters.size);
         if (filters.min_price) params.append('min_price', filters.min_price);
         if (filters.max_price) params.append('max_price', filters.max_price);
+        if (filters.sort) params.append('sort', filters.sort);
 
         const query = params.toString();
         const endpoint = `/products${query ? '?' + query : ''}`;
@@ -96,6 +97,32 @@ class LummeAPI {
         return this.request(endpoint);
     }
 
+    async getProductFacets(filters = {}) {
+        const params = new URLSearchParams();
+
+        if (filters.occasion) params.append('occasion', filters.occasion);
+        if (filters.size) params.append('size', filters.size);
+        if (filters.min_price) params.append('min_price', filters.min_price);
+        if (filters.max_price) params.append('max_price', filters.max_price);
+
+        const query = params.toString();
+        return this.request(`/products/facets${query ? '?' + query : ''}`);
+    }
+
+    async searchProducts(query, options = {}) {
+        const params = new URLSearchParams({ q: query });
+
+        if (options.page) params.append('page', options.page);
+        if (options.per_page) params.append('per_page', options.per_page);
+
+        return this.request(`/products/search?${params.toString()}`);
+    }
+
+    async suggestProducts(prefix, limit = 8) {
+        const params = new URLSearchParams({ q: prefix, limit });
+        return this.request(`/products/suggest?${params.toString()}`);
+    }
+
     async getProduct(productId) {
         return this.request(`/products/${productId}`);
     }
@@ -114,12 +141,42 @@ class LummeAPI {
         });
     }
 
+    async bulkUpdateProducts(items) {
+        return this.request('/products', {
+            method: 'PATCH',
+            body: JSON.stringify({ items })
+        });
+    }
+
     async deleteProduct(productId) {
         return this.request(`/products/${productId}`, {
             method: 'DELETE'
         });
     }
 
+    async importProducts(file, format = 'csv') {
+        return this.request(`/products/import?format=${format}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': format === 'csv' ? 'text/csv' : 'application/x-ndjson'
+            },
+            body: file
+        });
+    }
+
+    async exportProducts(format = 'csv') {
+        const response = await fetch(`${this.baseURL}/products/export?format=${format}`, {
+            headers: { 'Authorization': `Bearer ${this.token}` }
+        });
+
+        if (!response.ok) {
+            const data = await response.json();
+            throw new Error(data.error || 'API Error');
+        }
+
+        return response.blob();
+    }
+
     // ========== ЗАКАЗЫ ==========
 
     async createOrder(orderData) {
@@ -129,8 +186,22 @@ class LummeAPI {
         });
     }
 
-    async getOrders() {
-        return this.request('/orders');
+    async getOrders(filters = {}) {
+        const params = new URLSearchParams();
+
+        if (filters.status) params.append('status', filters.status);
+        if (filters.delivery_from) params.append('delivery_from', filters.delivery_from);
+        if (filters.delivery_to) params.append('delivery_to', filters.delivery_to);
+        if (filters.sort) params.append('sort', filters.sort);
+        if (filters.per_page) params.append('per_page', filters.per_page);
+        if (filters.cursor) params.append('cursor', filters.cursor);
+
+        const query = params.toString();
+        return this.request(`/orders${query ? '?' + query : ''}`);
+    }
+
+    async getOrdersSummary() {
+        return this.request('/orders/summary');
     }
 
     async updateOrderStatus(orderId, status) {
@@ -149,8 +220,14 @@ class LummeAPI {
         });
     }
 
-    async getProductReviews(productId) {
-        return this.request(`/products/${productId}/reviews`);
+    async getProductReviews(productId, options = {}) {
+        const params = new URLSearchParams();
+
+        if (options.cursor) params.append('cursor', options.cursor);
+        if (options.per_page) params.append('per_page', options.per_page);
+
+        const query = params.toString();
+        return this.request(`/products/${productId}/reviews${query ? '?' + query : ''}`);
     }
 
     // ========== ЗДОРОВЬЕ ==========